@@ -0,0 +1,47 @@
+import hashlib
+import tkinter
+import turtle
+from pathlib import Path
+
+# rasterizing needs cairosvg (``pip install cairosvg``). Without it, the prebuilt GIFs are used instead, which only fit the default board size of 600.
+try:
+	import cairosvg
+except ImportError:
+	cairosvg = None
+
+CACHE_DIR = Path('.asset_cache')  # where rasterized images are kept between runs
+RASTER_VERSION = b'1'  # part of every cache key. Change it if the way images are rasterized changes, so that old images aren't reused.
+
+
+def cached_raster(svg_path, size):
+	'''Get the path of an SVG rasterized to a PNG of ``size`` by ``size`` pixels, rasterizing it only if it isn't in the cache yet.
+	The cache is content-addressed: the file name is a hash of the SVG itself and the size, so editing an SVG can never bring back a stale image.
+	Returns `None` if the image isn't cached and can't be rasterized (see the import of ``cairosvg`` above).'''
+	svg = Path(svg_path).read_bytes()
+	path = CACHE_DIR / f'{hashlib.sha256(RASTER_VERSION + b":" + str(size).encode() + b":" + svg).hexdigest()}.png'
+	if not path.exists():
+		if cairosvg is None: return None
+		CACHE_DIR.mkdir(exist_ok=True)
+		# write to a temporary file and then rename it, so that a half-written image never ends up in the cache under its real name.
+		temp_path = path.with_suffix('.tmp')
+		cairosvg.svg2png(bytestring=svg, write_to=str(temp_path), output_width=size, output_height=size)
+		temp_path.replace(path)
+	return path
+
+
+def register_image(screen, name, svg_path, size):
+	'''Register an image shape with the screen under ``name``, loaded from the cached rasterization of ``svg_path`` at ``size`` pixels.
+	The name is kept the same as the prebuilt GIF's path since the rest of the code identifies pieces by their shape name (see ``logic.convert_file_to_name``).
+	If the image can't be rasterized, the prebuilt GIF at ``name`` is registered instead, but only if it is already ``size`` pixels; otherwise the program stops,
+	since pieces of the wrong size don't fit on the board.'''
+	path = cached_raster(svg_path, size)
+	if path is None:
+		# no rasterizer, so fall back to the prebuilt GIF.
+		image = tkinter.PhotoImage(master=screen.getcanvas(), file=name)
+		if image.width() != size:
+			raise SystemExit(f'Drawing {svg_path} at {size}px needs cairosvg (pip install cairosvg). Without it, only the default board size of 600 works.')
+	else:
+		# Tk reads PNGs itself, so the cached image can be loaded directly.
+		image = tkinter.PhotoImage(master=screen.getcanvas(), file=str(path))
+	# ``turtle`` only loads GIFs by name, so the shape is made manually.
+	screen.register_shape(name, turtle.Shape('image', image))
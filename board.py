@@ -0,0 +1,210 @@
+import util
+import logic
+
+# the directions that each piece can move in, as (x, y) steps. Sliding pieces repeat their steps until they're blocked; the others take one step.
+rook_directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+bishop_directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+knight_steps = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+directions = {'rook': rook_directions, 'bishop': bishop_directions, 'queen': rook_directions + bishop_directions, 'king': rook_directions + bishop_directions}
+sliders = {'rook', 'bishop', 'queen'}
+
+# how much each piece is worth, in pawns. The king has no value since capturing it ends the game.
+piece_values = {'king': 0, 'queen': 9, 'rook': 5, 'bishop': 3, 'knight': 3, 'pawn': 1}
+
+
+class Board:
+	'''A model of the board that holds plain data instead of turtles. The interface keeps its turtles in the piece array, but anything that has to run without a
+	window (the game journal, replaying a game) works with this instead. Each square holds `None` or a ``(color, shape, moved)`` tuple.'''
+
+	def __init__(self, squares, passant, taken, material=None):
+		'''Make a board model. Use ``Board.initial`` to get the starting position.
+		Arguments:
+		squares: an 8x8 array (rows within columns, like the piece array) of `None` or ``(color, shape, moved)`` tuples
+		passant: the (x, y) coordinate of the square that a pawn just jumped over, or `None` if the last move wasn't a double jump
+		taken: a dict of the number of captured pieces, indexed by color and then shape (the format that ``util.update_piece_indicators`` takes)
+		material: the total value of each color's pieces, if it's already known (see ``copy``). Otherwise it is counted from the squares.'''
+		self.squares = squares
+		self.passant = passant
+		self.taken = taken
+		# the total value of each color's pieces on the board (see ``piece_values``). After this it is kept up to date by ``apply``, never recounted.
+		if material is not None:
+			self.material = material
+			return
+		self.material = {color: 0 for color in util.colors}
+		for row in squares:
+			for square in row:
+				if square is not None: self.material[square[0]] += piece_values[square[1]]
+
+	@classmethod
+	def initial(cls):
+		'''Make the starting position. This uses the same layout as ``util.create_full_board``.'''
+		return cls(
+			[
+				[('light', piece, False) for piece in util.end_rows],  # white's end row
+				[('light', 'pawn', False) for _ in range(8)]  # white's pawns
+			] + [[None for __ in range(8)] for _ in range(4)] + [  # four rows of empty space
+				[('dark', 'pawn', False) for _ in range(8)],  # black's pawns
+				[('dark', piece, False) for piece in util.end_rows]  # black's end row
+			],
+			None,  # no pawn has jumped yet
+			{color: {shape: 0 for shape in util.shapes} for color in util.colors}  # nothing has been captured yet
+		)
+
+	def copy(self):
+		'''Make an independent copy of the board. The squares hold tuples, so copying the rows is enough, and the material is carried over instead of recounted.'''
+		return Board([row[:] for row in self.squares], self.passant, {color: dict(counts) for color, counts in self.taken.items()}, dict(self.material))
+
+	def material_balance(self):
+		'''Get how far ahead white is in material, in pawns. Negative means black is ahead.'''
+		return self.material['light'] - self.material['dark']
+
+	def passant_pawn(self):
+		'''Get the coordinate of the pawn that the en passant square refers to. The pawn is always one square further along than the square it jumped over.'''
+		x, y = self.passant
+		# white's pawns jump over row 2 to row 3, and black's jump over row 5 to row 4.
+		return x, (3 if y == 2 else 4)
+
+	def apply(self, move):
+		'''Make a recorded move (``logic.RecordedMove`` or ``logic.RecordedCastle``) on the board, the same way ``logic.onclick`` makes it on the piece array.
+		Returns the ``(color, shape, moved)`` tuple of the captured piece, or `None` if nothing was captured.'''
+		if isinstance(move, logic.RecordedCastle):
+			# castling happens on the row that the color's pieces start on.
+			y = 0 if move.color == 'light' else 7
+			# the king always starts on column 4, and the rook on column 7 (kingside) or 0 (queenside).
+			king_to, rook_from, rook_to = (6, 7, 5) if move.is_kingside else (2, 0, 3)
+			# move both pieces, marking them as moved.
+			self.squares[y][king_to], self.squares[y][4] = self.squares[y][4][:2] + (True,), None
+			self.squares[y][rook_to], self.squares[y][rook_from] = self.squares[y][rook_from][:2] + (True,), None
+			self.passant = None
+			return None
+		from_x, from_y = move.from_pos  # unpack
+		to_x, to_y = move.to_pos  # ^
+		# find the captured piece's position. Capturing onto the en passant square captures the pawn that jumped over it.
+		kill_x, kill_y = self.passant_pawn() if move.was_capture and self.passant == (to_x, to_y) else (to_x, to_y)
+		killed = self.squares[kill_y][kill_x]
+		self.squares[kill_y][kill_x] = None
+		color, shape, _ = self.squares[from_y][from_x]
+		# move the piece, promoting it if necessary, and mark it as moved.
+		self.squares[to_y][to_x] = (color, move.promotion if move.promotion is not None else shape, True)
+		self.squares[from_y][from_x] = None
+		# a pawn moving two squares makes a new en passant square between its start and end, replacing any old one.
+		self.passant = (to_x, (from_y + to_y) // 2) if shape == 'pawn' and abs(to_y - from_y) == 2 else None
+		if move.promotion is not None:
+			# the pawn turns into the promoted piece.
+			self.material[color] += piece_values[move.promotion] - piece_values['pawn']
+		if killed is not None:
+			# count the capture, and take away the captured piece's value.
+			self.taken[killed[0]][killed[1]] += 1
+			self.material[killed[0]] -= piece_values[killed[1]]
+		return killed
+
+	def create_turtles(self, screen):
+		'''Make the piece array (turtles and ``logic.PassantReference``s) that matches this board, without moving the pieces to their squares. Use
+		``util.move_board_pieces`` for that, just like with ``util.create_full_board``.'''
+		piece_arr = [[None for __ in range(8)] for _ in range(8)]
+		for y, row in enumerate(self.squares):
+			for x, square in enumerate(row):
+				if square is not None:
+					# make the piece, and turn it if it has moved (see ``logic.has_moved``).
+					piece_arr[y][x] = util.create_piece(screen, square[0], square[1])
+					if square[2]: piece_arr[y][x].seth(10)
+		if self.passant is not None:
+			# put the en passant reference back, pointing at the pawn that made it.
+			pawn_x, pawn_y = self.passant_pawn()
+			piece_arr[self.passant[1]][self.passant[0]] = logic.PassantReference(piece_arr[pawn_y][pawn_x])
+		return piece_arr
+
+	def moves(self, color):
+		'''Generate every move that ``color`` can make, as ``logic.RecordedMove``s and ``logic.RecordedCastle``s that can be passed to ``apply``.
+		Like the game itself, this doesn't look for check: a king can be moved into danger, and the game is won by capturing it.'''
+		forward = 1 if color == 'light' else -1  # light pawns move down the array and dark pawns move up
+		for y, row in enumerate(self.squares):
+			for x, square in enumerate(row):
+				if square is None or square[0] != color: continue  # only the color's own pieces can move
+				shape = square[1]
+				if shape == 'pawn':
+					yield from self.pawn_moves(color, x, y, forward)
+					continue
+				# every other piece steps in its directions, sliding pieces repeating the step until they're blocked.
+				for step_x, step_y in (knight_steps if shape == 'knight' else directions[shape]):
+					to_x, to_y = x + step_x, y + step_y
+					while 0 <= to_x < 8 and 0 <= to_y < 8:
+						target = self.squares[to_y][to_x]
+						if target is not None and target[0] == color: break  # blocked by a piece of the same color
+						yield logic.RecordedMove(color, shape, (x, y), (to_x, to_y), target is not None, None)
+						if target is not None or shape not in sliders: break  # stop after a capture, or after one step for non-sliding pieces
+						to_x, to_y = to_x + step_x, to_y + step_y
+		# castling: neither the king nor the rook can have moved, and the squares between them must be empty.
+		y = 0 if color == 'light' else 7
+		if self.squares[y][4] == (color, 'king', False):
+			for rook_x, is_kingside in [(7, True), (0, False)]:
+				if self.squares[y][rook_x] == (color, 'rook', False) and all(self.squares[y][x] is None for x in logic.exclusive_range(4, rook_x)):
+					yield logic.RecordedCastle(color, is_kingside)
+
+	def pawn_moves(self, color, x, y, forward):
+		'''Generate the moves of the pawn at (x, y). Used by ``moves``.'''
+		to_y = y + forward
+		if not 0 <= to_y < 8: return  # pawns on the last row have already been promoted, so this can only happen on a handmade board
+		# when a pawn reaches the last row, it can be promoted to any of ``util.promotable_to``.
+		promotions = util.promotable_to if to_y == (7 if color == 'light' else 0) else [None]
+		if self.squares[to_y][x] is None:
+			# moving forward by one needs an empty square, ...
+			for promotion in promotions:
+				yield logic.RecordedMove(color, 'pawn', (x, y), (x, to_y), False, promotion)
+			# ...and jumping forward by two from the starting row needs both squares to be empty.
+			if y == (1 if color == 'light' else 6) and self.squares[to_y + forward][x] is None:
+				yield logic.RecordedMove(color, 'pawn', (x, y), (x, to_y + forward), False, None)
+		for to_x in [x - 1, x + 1]:
+			# capturing is diagonal, onto either a piece of the other color or the en passant square.
+			if not 0 <= to_x < 8: continue
+			target = self.squares[to_y][to_x]
+			if (target is not None and target[0] != color) or self.passant == (to_x, to_y):
+				for promotion in promotions:
+					yield logic.RecordedMove(color, 'pawn', (x, y), (to_x, to_y), True, promotion)
+
+	def is_attacked(self, pos, by_color):
+		'''Check whether any piece of ``by_color`` could capture on ``pos``. Looks outward from the square instead of generating every move, since it's much
+		faster.'''
+		x, y = pos  # unpack
+		# pawns capture diagonally forward, so look one row back (from their point of view) for them.
+		pawn_y = y - (1 if by_color == 'light' else -1)
+		if 0 <= pawn_y < 8:
+			for pawn_x in [x - 1, x + 1]:
+				square = self.squares[pawn_y][pawn_x] if 0 <= pawn_x < 8 else None
+				if square is not None and square[0] == by_color and square[1] == 'pawn': return True
+		# knights and kings take one step; look one step away in each of their directions.
+		for shape, steps in [('knight', knight_steps), ('king', directions['king'])]:
+			for step_x, step_y in steps:
+				from_x, from_y = x + step_x, y + step_y
+				if 0 <= from_x < 8 and 0 <= from_y < 8:
+					square = self.squares[from_y][from_x]
+					if square is not None and square[0] == by_color and square[1] == shape: return True
+		# sliding pieces: look along each line until something is in the way, and check whether it's a piece that slides along that line.
+		for lines, shapes in [(rook_directions, ('rook', 'queen')), (bishop_directions, ('bishop', 'queen'))]:
+			for step_x, step_y in lines:
+				from_x, from_y = x + step_x, y + step_y
+				while 0 <= from_x < 8 and 0 <= from_y < 8:
+					square = self.squares[from_y][from_x]
+					if square is not None:
+						if square[0] == by_color and square[1] in shapes: return True
+						break
+					from_x, from_y = from_x + step_x, from_y + step_y
+		return False
+
+	def find_king(self, color):
+		'''Get the coordinate of ``color``'s king, or `None` if it has been captured.'''
+		for y, row in enumerate(self.squares):
+			for x, square in enumerate(row):
+				if square is not None and square[0] == color and square[1] == 'king': return x, y
+		return None
+
+	def find_move(self, color, from_pos, to_pos):
+		'''Find the move that ``color`` makes by clicking ``from_pos`` and then ``to_pos``, or return `None` if there isn't one. Castling is clicked as in the
+		game, by clicking the king and the rook in either order. Promotions are always to a queen.'''
+		for move in self.moves(color):
+			if isinstance(move, logic.RecordedCastle):
+				y = 0 if color == 'light' else 7
+				if {from_pos, to_pos} == {(4, y), (7 if move.is_kingside else 0, y)}: return move
+			elif move.from_pos == from_pos and move.to_pos == to_pos and move.promotion in (None, 'queen'):
+				return move
+		return None
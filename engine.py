@@ -0,0 +1,329 @@
+import time
+import threading
+import util
+import logic
+from board import piece_values
+
+MATE = 100000  # the score of capturing the king, give or take the number of moves it takes
+INFINITY = 1000000  # bigger than any score
+MAX_DEPTH = 64  # the deepest an unlimited search goes
+other_color = {'light': 'dark', 'dark': 'light'}
+
+# how the transposition table's scores relate to the real score of the position: exact, at least this much (a cutoff), or at most this much (nothing better).
+EXACT, LOWER, UPPER = 0, 1, 2
+ENTRY_BYTES = 288  # about how much memory one transposition table entry takes: its slot, the entry itself, the position key, and the numbers in it
+
+# a byte for every kind of square (empty, or each color and shape, moved or not), for ``position_key``.
+square_codes = {
+	square: code for code, square in enumerate([None] + [(color, shape, moved) for color in util.colors for shape in util.shapes for moved in (False, True)])
+}
+NO_PASSANT = 0xFF  # stands in for `None` where the en passant square goes in a position key
+
+
+class SearchStopped(Exception):
+	'''Raised inside the search to unwind it when it runs out of time or is stopped.'''
+
+
+def move_key(move):
+	'''Get a number that identifies a move, for comparing moves from different places (moves are new objects every time they're generated), and for keeping in
+	the transposition table, where a number takes far less memory than the move. Whether it captures is included, since the game counts a piece landing on the
+	en passant square as capturing the pawn, and the board model only does that for pawns.'''
+	if isinstance(move, logic.RecordedCastle): return 1 << 16 | (move.color == 'dark') << 1 | move.is_kingside
+	promotion = 0 if move.promotion is None else util.promotable_to.index(move.promotion) + 1
+	return (move.from_pos[1] * 8 + move.from_pos[0]) | (move.to_pos[1] * 8 + move.to_pos[0]) << 6 | move.was_capture << 12 | promotion << 13
+
+
+def position_key(board_model, color):
+	'''Get the bytes that identify a position, for the transposition table: one for each square (see ``square_codes``), then the en passant square and whose
+	turn it is, since they change everything.'''
+	passant = NO_PASSANT if board_model.passant is None else board_model.passant[1] * 8 + board_model.passant[0]
+	return bytes([square_codes[square] for row in board_model.squares for square in row] + [passant, color == 'dark'])
+
+
+def evaluate(board_model, color):
+	'''Score the position from ``color``'s point of view, in hundredths of a pawn. This is mostly material (which the board model keeps track of), with small
+	bonuses for minor pieces and queens near the center and for pawns that have advanced.'''
+	score = board_model.material_balance() * 100
+	for y, row in enumerate(board_model.squares):
+		for x, square in enumerate(row):
+			if square is None: continue
+			if square[1] == 'pawn':
+				# light pawns advance up the array from row 1, and dark pawns down from row 6. Pawns in the middle four files count for more.
+				bonus = (5 if 2 <= x <= 5 else 2) * ((y - 1) if square[0] == 'light' else (6 - y))
+			elif square[1] in ('knight', 'bishop', 'queen'):
+				# 0 in the corners up to 6 in the four middle squares.
+				bonus = 3 * (7 - (abs(7 - 2 * x) + abs(7 - 2 * y)) // 2)
+			else:
+				continue
+			score += bonus if square[0] == 'light' else -bonus
+	return score if color == 'light' else -score
+
+
+def make_move(board_model, color, move, king_pos):
+	'''Make a move on a copy of the board, returning the copy, or `None` if the move isn't legal because it leaves the king in check. ``king_pos`` is where
+	``color``'s king is before the move. The game itself doesn't mind moving into check, but standard chess (and so every other engine) does.'''
+	opponent = other_color[color]
+	if isinstance(move, logic.RecordedCastle):
+		# castling can't start in, pass through, or end in check.
+		y = king_pos[1]
+		passing, king_pos = ((5, y), (6, y)) if move.is_kingside else ((3, y), (2, y))
+		if board_model.is_attacked((4, y), opponent) or board_model.is_attacked(passing, opponent): return None
+	elif move.from_pos == king_pos:
+		king_pos = move.to_pos
+	child = board_model.copy()
+	child.apply(move)
+	return None if child.is_attacked(king_pos, opponent) else child
+
+
+def legal_moves(board_model, color):
+	'''Get every legal move that ``color`` can make (see ``make_move``), as pairs of the move and the board after it.'''
+	king_pos = board_model.find_king(color)
+	children = [(move, make_move(board_model, color, move, king_pos)) for move in board_model.moves(color)]
+	return [(move, child) for move, child in children if child is not None]
+
+
+def move_order(board_model, move, best_key):
+	'''Sort key for searching the most promising moves first: the best move from the transposition table, then captures of valuable pieces by cheap ones, then
+	promotions, then everything else.'''
+	if move_key(move) == best_key: return -INFINITY
+	if isinstance(move, logic.RecordedCastle): return 0
+	score = 0
+	if move.was_capture:
+		victim = board_model.squares[move.to_pos[1]][move.to_pos[0]]
+		# an empty square is an en passant capture, of a pawn.
+		score -= 10 * piece_values['pawn' if victim is None else victim[1]] - piece_values[move.piece[1]]
+	if move.promotion is not None: score -= piece_values[move.promotion]
+	return score
+
+
+class Engine:
+	'''Searches for the best move with iterative deepening alpha-beta. The transposition table is kept between searches, so each search starts from what the
+	last one learned.'''
+
+	def __init__(self, table_mb=32):
+		'''Make an engine.
+		Arguments:
+		table_mb: about how much memory the transposition table uses, in megabytes. It has a fixed number of slots, so it never grows past this.'''
+		# each slot holds `None` or a ``(position key, depth, score, bound, move key, generation)`` tuple (see ``store``).
+		self.table = [None] * (table_mb * 2**20 // ENTRY_BYTES)
+		self.generation = 0  # counts searches, so that entries left from earlier searches are replaced first
+		self.stop_event = threading.Event()  # set from any thread to stop the search (see ``stop``)
+		self.start = None  # when the current search started, from ``time.perf_counter``
+		self.deadline = None  # when the current search has to stop, from ``time.perf_counter``, or `None` for no limit
+		self.nodes = 0  # the number of positions looked at by the current search
+		self.exclude = ()  # the ``move_key``s of the moves that the current search doesn't consider at the root
+
+	def clear(self):
+		'''Forget everything in the transposition table, for a new game.'''
+		self.table = [None] * len(self.table)
+
+	def probe(self, key):
+		'''Get the transposition table's entry for the position with ``key`` (see ``position_key``), or `None` if it isn't in the table.'''
+		entry = self.table[hash(key) % len(self.table)]
+		return entry if entry is not None and entry[0] == key else None
+
+	def store(self, key, depth, score, bound, move):
+		'''Put the result of searching a position in the transposition table. Each position has only one slot, so whatever is there is replaced only if it is
+		the same position, left from an earlier search, or searched less deeply: the deep results are the ones that save the most time.'''
+		index = hash(key) % len(self.table)
+		entry = self.table[index]
+		if entry is None or entry[0] == key or entry[5] != self.generation or entry[1] <= depth:
+			self.table[index] = (key, depth, score, bound, move_key(move), self.generation)
+
+	def stop(self):
+		'''Stop the search as soon as possible. The search returns the best move of the deepest search it finished.'''
+		self.stop_event.set()
+
+	def ponderhit(self, movetime):
+		'''Give a search with no time limit (pondering on the opponent's expected move, which they just made) a limit of ``movetime`` seconds, counted from when
+		it started. If it has already searched for that long, it stops right away.'''
+		self.deadline = self.start + movetime
+
+	def search(self, board_model, color, depth=None, movetime=None, info=None, exclude=()):
+		'''Find the best move for ``color``, searching one move deeper at a time until the ``depth`` or ``movetime`` (in seconds) runs out, or until stopped.
+		With neither limit, the search goes until it's stopped (see ``stop``). The caller clears ``stop_event`` before searching.
+		``info`` is called after each depth with the depth, the score, the number of nodes, the time taken, and the principal variation.
+		``exclude`` holds the ``move_key``s of moves not to play (see ``Opponent.move_rejected``).
+		Returns the best move and the principal variation, or `None` and an empty list if there are no legal moves.'''
+		self.start = start = time.perf_counter()
+		self.deadline = None if movetime is None else start + movetime
+		self.nodes = 0
+		self.exclude = exclude
+		self.generation += 1
+		if board_model.find_king(color) is None: return None, []  # the game is already lost
+		opponent_king = board_model.find_king(other_color[color])
+		if opponent_king is not None and board_model.is_attacked(opponent_king, color):
+			# the game (unlike standard chess) lets a player leave their king where it can be captured, which wins immediately.
+			captures = [move for move in board_model.moves(color) if isinstance(move, logic.RecordedMove) and move.to_pos == opponent_king]
+			captures = [move for move in captures if move_key(move) not in exclude]
+			if captures: return captures[0], captures[:1]
+		root_moves = [(move, child) for move, child in legal_moves(board_model, color) if move_key(move) not in exclude]
+		if not root_moves: return None, []
+		# in case the first depth doesn't finish, fall back to any legal move.
+		best_move, pv = root_moves[0][0], [root_moves[0][0]]
+		for current_depth in range(1, (depth or MAX_DEPTH) + 1):
+			try:
+				score = self.negamax(board_model, color, current_depth, -INFINITY, INFINITY, 0)
+			except SearchStopped:
+				break
+			pv = self.principal_variation(board_model, color, current_depth) or pv
+			best_move = pv[0]
+			if info is not None: info(current_depth, score, self.nodes, time.perf_counter() - start, pv)
+			# there's no point in searching deeper once a forced mate is found (either way).
+			if abs(score) >= MATE - MAX_DEPTH: break
+		return best_move, pv
+
+	def check_stop(self):
+		'''Unwind the search if it has been stopped or is out of time.'''
+		if self.stop_event.is_set() or (self.deadline is not None and time.perf_counter() >= self.deadline): raise SearchStopped
+
+	def negamax(self, board_model, color, depth, alpha, beta, ply):
+		'''Score the position from ``color``'s point of view by searching ``depth`` moves ahead, with alpha-beta pruning and the transposition table.'''
+		self.nodes += 1
+		if self.nodes % 1024 == 0: self.check_stop()  # checking the clock is slow, so only do it every so often
+		if depth <= 0: return self.quiesce(board_model, color, alpha, beta, ply)
+		key = position_key(board_model, color)
+		entry = self.probe(key)
+		best_key = None
+		if entry is not None:
+			_, entry_depth, entry_score, entry_bound, best_key, _ = entry
+			# a deep enough result can be used directly (except at the root, where the best move has to be found again).
+			if entry_depth >= depth and ply > 0 and (
+				entry_bound == EXACT or (entry_bound == LOWER and entry_score >= beta) or (entry_bound == UPPER and entry_score <= alpha)
+			):
+				return entry_score
+		original_alpha = alpha
+		best_score, best_move = -INFINITY, None
+		king_pos = board_model.find_king(color)
+		for move in sorted(board_model.moves(color), key=lambda move: move_order(board_model, move, best_key)):
+			if ply == 0 and move_key(move) in self.exclude: continue
+			child = make_move(board_model, color, move, king_pos)
+			if child is None: continue  # illegal
+			score = -self.negamax(child, other_color[color], depth - 1, -beta, -alpha, ply + 1)
+			if score > best_score: best_score, best_move = score, move
+			alpha = max(alpha, score)
+			if alpha >= beta: break  # the opponent won't allow this position, so stop looking
+		if best_move is None:
+			# no legal moves: checkmate (the sooner the worse) or stalemate.
+			return -(MATE - ply) if board_model.is_attacked(king_pos, other_color[color]) else 0
+		bound = UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT
+		self.store(key, depth, best_score, bound, best_move)
+		return best_score
+
+	def quiesce(self, board_model, color, alpha, beta, ply):
+		'''Search only captures and promotions until the position is quiet, so that the search doesn't stop in the middle of an exchange.'''
+		self.nodes += 1
+		if self.nodes % 1024 == 0: self.check_stop()
+		# the side to move doesn't have to capture, so the static score is a lower bound.
+		best_score = evaluate(board_model, color)
+		if best_score >= beta: return best_score
+		alpha = max(alpha, best_score)
+		king_pos = board_model.find_king(color)
+		noisy = [move for move in board_model.moves(color) if isinstance(move, logic.RecordedMove) and (move.was_capture or move.promotion is not None)]
+		for move in sorted(noisy, key=lambda move: move_order(board_model, move, None)):
+			child = make_move(board_model, color, move, king_pos)
+			if child is None: continue
+			score = -self.quiesce(child, other_color[color], -beta, -alpha, ply + 1)
+			best_score = max(best_score, score)
+			alpha = max(alpha, score)
+			if alpha >= beta: break
+		return best_score
+
+	def principal_variation(self, board_model, color, depth):
+		'''Follow the best moves in the transposition table from the position, to get the line the engine expects.'''
+		pv = []
+		seen = set()  # to stop at repeated positions, which would go on forever
+		while len(pv) < depth:
+			key = position_key(board_model, color)
+			entry = self.probe(key)
+			if entry is None or key in seen: break
+			seen.add(key)
+			# the table only has the move's key, so find the move itself.
+			move = next((move for move in board_model.moves(color) if move_key(move) == entry[4]), None)
+			if move is None: break
+			board_model = make_move(board_model, color, move, board_model.find_king(color))
+			if board_model is None: break
+			pv.append(move)
+			color = other_color[color]
+		return pv
+
+
+class Opponent:
+	'''Plays one color against a human. The engine thinks on a background thread so that the window stays responsive, and keeps thinking while the human
+	decides on their move (pondering): it guesses the human's reply from its principal variation and searches the position after it. If the guess is right,
+	that search just carries on (and may already be done); if not, the new search still starts with everything the transposition table learned.'''
+
+	def __init__(self, color, movetime):
+		'''Make an opponent.
+		Arguments:
+		color: the color the engine plays
+		movetime: how long the engine thinks about each move, in seconds'''
+		self.engine = Engine()
+		self.color = color
+		self.movetime = movetime
+		self.thread = None  # the thread that is searching, if there is one
+		self.result = None  # what the last search returned (see ``Engine.search``)
+		self.ponder_key = None  # the ``move_key`` of the reply being pondered on, or `None` if not pondering
+		self.rejected = set()  # the ``move_key``s of the moves that the game didn't accept in the current position (see ``move_rejected``)
+
+	def think(self, board_model, movetime, exclude=()):
+		'''Start searching the position on a background thread, stopping any search that's already going.'''
+		self.stop()
+		self.engine.stop_event.clear()
+		self.result = None
+		self.thread = threading.Thread(target=self.run_search, args=(board_model.copy(), movetime, frozenset(exclude)), daemon=True)
+		self.thread.start()
+
+	def run_search(self, board_model, movetime, exclude):
+		'''Search and keep the result. Runs on the background thread.'''
+		self.result = self.engine.search(board_model, self.color, movetime=movetime, exclude=exclude)
+
+	def start_move(self, board_model):
+		'''Start thinking about the engine's move in this position.'''
+		self.think(board_model, self.movetime, self.rejected)
+
+	def move_rejected(self, board_model, move):
+		'''Tell the engine that the game didn't accept ``move`` (its rules differ from standard chess in a few corners). The engine thinks again without it.'''
+		self.rejected.add(move_key(move))
+		self.start_move(board_model)
+
+	def ponder(self, board_model, pv):
+		'''Start pondering after the engine has made its move (the first move of ``pv``, already made on ``board_model``), assuming that the human makes the
+		next move in ``pv``. Without a guess, nothing happens.'''
+		self.stop()
+		if len(pv) < 2: return
+		expected_board = board_model.copy()
+		expected_board.apply(pv[1])
+		self.think(expected_board, None)  # no time limit until the human moves
+		self.ponder_key = move_key(pv[1])
+
+	def opponent_moved(self, move, board_model):
+		'''Tell the engine that the human made ``move``, leading to ``board_model``. The engine starts (or carries on) thinking about its reply.'''
+		self.rejected.clear()  # a new position
+		if self.ponder_key is not None and move_key(move) == self.ponder_key:
+			# the guess was right: give the pondering search the time limit that counts its head start.
+			self.ponder_key = None
+			self.engine.ponderhit(self.movetime)
+		else:
+			self.start_move(board_model)
+
+	def poll(self):
+		'''Get the result of the search for the engine's move (the best move and the principal variation) if it's done, or `None` if it isn't (or if the
+		engine is only pondering).'''
+		if self.ponder_key is not None or self.thread is None or self.thread.is_alive(): return None
+		self.thread = None
+		return self.result
+
+	def new_game(self):
+		'''Stop thinking and forget the last game: the transposition table, and the moves the game didn't accept.'''
+		self.stop()
+		self.engine.clear()
+		self.rejected.clear()
+
+	def stop(self):
+		'''Stop thinking, without making a move.'''
+		if self.thread is not None:
+			self.engine.stop()
+			self.thread.join()
+			self.thread = None
+		self.ponder_key = None
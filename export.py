@@ -0,0 +1,152 @@
+import util
+import logic
+import journal
+import argparse
+import numpy as np
+from pathlib import Path
+from board import Board
+
+# every position is stored as one record. The planes are one 8x8 layer per color and piece (in the order of ``util.colors`` and ``util.shapes``), with a 1
+# wherever that piece is. The move is packed by ``encode_move``, and the result is from white's side: 1 for a win, -1 for a loss, and 0 for anything else.
+record_dtype = np.dtype([
+	('planes', np.uint8, (len(util.colors) * len(util.shapes), 8, 8)),
+	('side', np.uint8),  # 0 if it's white's turn, 1 if it's black's
+	('move', np.uint16),
+	('result', np.int8)
+])
+
+
+def encode_move(move):
+	'''Pack a ``logic.RecordedMove`` or ``logic.RecordedCastle`` into a number: the from square, the to square (each ``y * 8 + x``), and the promotion (0 for
+	none, otherwise one more than its index in ``util.promotable_to``), in that order from the lowest bits up. Castling is packed as the king's move.'''
+	if isinstance(move, logic.RecordedCastle):
+		y = 0 if move.color == 'light' else 7
+		return (y * 8 + 4) | (y * 8 + (6 if move.is_kingside else 2)) << 6
+	promotion = 0 if move.promotion is None else util.promotable_to.index(move.promotion) + 1
+	return (move.from_pos[1] * 8 + move.from_pos[0]) | (move.to_pos[1] * 8 + move.to_pos[0]) << 6 | promotion << 12
+
+
+def fill_planes(planes, board_model):
+	'''Write the position on ``board_model`` into ``planes`` (see ``record_dtype``), in place.'''
+	planes[:] = 0
+	for y, row in enumerate(board_model.squares):
+		for x, square in enumerate(row):
+			if square is not None:
+				planes[util.colors.index(square[0]) * len(util.shapes) + util.shapes.index(square[1]), y, x] = 1
+
+
+def game_result(moves):
+	'''Find the result of a game from its moves: the game is won by capturing the king, so replay it and look for that. Returns 1, -1, or 0 (see
+	``record_dtype``).'''
+	board_model = Board.initial()
+	for move in moves:
+		killed = board_model.apply(move)
+		if killed is not None and killed[1] == 'king':
+			return -1 if killed[0] == 'light' else 1
+	return 0
+
+
+class ShardWriter:
+	'''Writes records into ``.npy`` shards of a fixed number of records each. Only the shard being filled is kept in memory, so any number of games can be
+	exported with the same amount of memory. The last shard is shorter if the records don't fill it.'''
+
+	def __init__(self, directory, shard_size=65536):
+		'''Make a shard writer.
+		Arguments:
+		directory: where the shards are written. It is made if it doesn't exist, and it can't already have shards in it.
+		shard_size: the number of records in each shard'''
+		self.directory = Path(directory)
+		self.directory.mkdir(parents=True, exist_ok=True)
+		# ``ShardReader`` reads every shard in the directory, so shards left from an earlier export would be mixed in with these (or overwritten, if there were
+		# more of them). Refuse instead of deleting data that someone may want.
+		if any(self.directory.glob('shard-*.npy')): raise FileExistsError(f'{directory} already has shards in it')
+		self.shard_size = shard_size
+		self.buffer = np.zeros(shard_size, dtype=record_dtype)
+		self.filled = 0  # the number of records in the buffer
+		self.shard_count = 0  # the number of shards written so far
+
+	def add_game(self, moves, result=None):
+		'''Add a record for every position in a game, replaying it on a board model. If the ``result`` isn't given, it is found with ``game_result``.'''
+		if result is None: result = game_result(moves)
+		board_model = Board.initial()
+		for i, move in enumerate(moves):
+			# the record describes the position before the move, and the move that was played from it.
+			# (indexing the field first gives a view of the buffer, so the planes are filled in place.)
+			fill_planes(self.buffer['planes'][self.filled], board_model)
+			self.buffer['side'][self.filled] = i % 2  # white always moves first
+			self.buffer['move'][self.filled] = encode_move(move)
+			self.buffer['result'][self.filled] = result
+			self.filled += 1
+			if self.filled == self.shard_size: self.flush()
+			board_model.apply(move)
+
+	def flush(self):
+		'''Write the records in the buffer as a shard, if there are any.'''
+		if self.filled == 0: return
+		np.save(self.directory / f'shard-{self.shard_count:05d}.npy', self.buffer[:self.filled])
+		self.shard_count += 1
+		self.filled = 0
+
+	def close(self):
+		'''Write the last, possibly short, shard.'''
+		self.flush()
+
+
+class ShardReader:
+	'''Reads the shards made by ``ShardWriter``. The shards are memory-mapped, so nothing is read from the disk until it is used, and batches are views into
+	the mapped files instead of copies.'''
+
+	def __init__(self, directory):
+		'''Open every shard in ``directory``.'''
+		self.shards = [np.load(path, mmap_mode='r') for path in sorted(Path(directory).glob('shard-*.npy'))]
+		# where each shard starts, counting records across all shards. The last item is the total number of records.
+		self.starts = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+	def __len__(self):
+		'''Get the total number of records.'''
+		return int(self.starts[-1])
+
+	def locate(self, index):
+		'''Find the shard that holds the record at ``index``, and the record's index within it.'''
+		shard = int(np.searchsorted(self.starts, index, side='right')) - 1
+		return shard, index - int(self.starts[shard])
+
+	def batch(self, start, size):
+		'''Get ``size`` records (fewer at the end of the data) starting at ``start``, as a view of the mapped shard. Batches don't cross shards, so the batch
+		stops at the end of the shard that ``start`` is in; use a batch size that divides the shard size to always get full batches.'''
+		shard, offset = self.locate(start)
+		return self.shards[shard][offset:offset + size]
+
+	def batches(self, size):
+		'''Go through all of the records in order, ``size`` at a time (see ``batch``).'''
+		for shard in self.shards:
+			for offset in range(0, len(shard), size):
+				yield shard[offset:offset + size]
+
+	def random_batches(self, size, rng=None):
+		'''Go through every batch of ``size`` records (see ``batches``) in a random order, forever. Each batch is still a view of consecutive records, so shuffle
+		the records themselves when exporting if they need to be independent.'''
+		rng = np.random.default_rng() if rng is None else rng
+		# the (shard, offset) pairs where batches start.
+		starts = [(shard, offset) for shard in range(len(self.shards)) for offset in range(0, len(self.shards[shard]), size)]
+		while True:
+			for i in rng.permutation(len(starts)):
+				shard, offset = starts[i]
+				yield self.shards[shard][offset:offset + size]
+
+
+if __name__ == '__main__':
+	# export the games in the given journals.
+	parser = argparse.ArgumentParser(description='Chess Refined: export the positions in recorded games as training data')
+	parser.add_argument('output', help='the directory to write the shards to')
+	parser.add_argument('journals', nargs='+', help='game journals to export (see ``journal.Journal``)')
+	parser.add_argument('--shard-size', type=int, default=65536, help='the number of positions in each shard (default: 65536)')
+	args = parser.parse_args()
+	try:
+		writer = ShardWriter(args.output, args.shard_size)
+	except FileExistsError as e:
+		parser.error(f'{e}; choose an empty directory')
+	for path in args.journals:
+		writer.add_game(journal.read_journal(path)[1])
+	writer.close()
+	print(f'Exported {writer.shard_count} shard(s) to {args.output}.')
@@ -0,0 +1,166 @@
+import os
+import struct
+import util
+import logic
+from board import Board
+
+# the journal is a header followed by records, each starting with a one-byte tag. Every record has a fixed size, so reading never needs any length fields.
+MAGIC = b'CRJ\x01'
+MOVE_TAG, CASTLE_TAG, SNAPSHOT_TAG = b'M'[0], b'C'[0], b'S'[0]
+MOVE = struct.Struct('<BBBBB')  # tag, piece (color and shape), from square, to square, flags (capture and promotion)
+CASTLE = struct.Struct('<BBB')  # tag, color, kingside
+SNAPSHOT = struct.Struct('<BI64sB12s')  # tag, number of moves before it, squares, en passant square, captured piece counts
+RECORDS = {MOVE_TAG: MOVE, CASTLE_TAG: CASTLE, SNAPSHOT_TAG: SNAPSHOT}
+
+NO_SQUARE = 0xFF  # stands in for `None` where a square is expected
+
+
+def encode_square(pos):
+	'''Pack an (x, y) coordinate into one byte.'''
+	return NO_SQUARE if pos is None else pos[1] * 8 + pos[0]
+def decode_square(byte):  # noqa: E302 (two lines between base-level definitions) - these functions are twins
+	'''Unpack a coordinate packed by ``encode_square``.'''
+	return None if byte == NO_SQUARE else (byte % 8, byte // 8)
+
+
+def encode_move(move):
+	'''Pack a ``logic.RecordedMove`` or ``logic.RecordedCastle`` into a journal record.'''
+	if isinstance(move, logic.RecordedCastle):
+		return CASTLE.pack(CASTLE_TAG, util.colors.index(move.color), move.is_kingside)
+	color, shape = move.piece
+	# the lowest bit of the flags is the capture, and the bits above it are the promotion (0 for none, otherwise one more than its index).
+	promotion = 0 if move.promotion is None else util.promotable_to.index(move.promotion) + 1
+	return MOVE.pack(
+		MOVE_TAG,
+		util.colors.index(color) * len(util.shapes) + util.shapes.index(shape),
+		encode_square(move.from_pos),
+		encode_square(move.to_pos),
+		move.was_capture | promotion << 1
+	)
+
+
+def decode_move(record):
+	'''Unpack a journal record made by ``encode_move``.'''
+	if record[0] == CASTLE_TAG:
+		_, color, is_kingside = CASTLE.unpack(record)
+		return logic.RecordedCastle(util.colors[color], bool(is_kingside))
+	_, piece, from_square, to_square, flags = MOVE.unpack(record)
+	return logic.RecordedMove(
+		util.colors[piece // len(util.shapes)],
+		util.shapes[piece % len(util.shapes)],
+		decode_square(from_square),
+		decode_square(to_square),
+		bool(flags & 1),
+		util.promotable_to[(flags >> 1) - 1] if flags >> 1 else None
+	)
+
+
+def encode_snapshot(board_model, move_count):
+	'''Pack a ``Board`` into a snapshot record. Each square is a byte: 0 for empty, otherwise one more than the piece's index, with the top bit set if it moved.'''
+	squares = bytes(
+		0 if square is None else (1 + util.colors.index(square[0]) * len(util.shapes) + util.shapes.index(square[1])) | (0x80 if square[2] else 0)
+		for row in board_model.squares for square in row
+	)
+	taken = bytes(board_model.taken[color][shape] for color in util.colors for shape in util.shapes)
+	return SNAPSHOT.pack(SNAPSHOT_TAG, move_count, squares, encode_square(board_model.passant), taken)
+
+
+def decode_snapshot(record):
+	'''Unpack a snapshot record made by ``encode_snapshot``. Returns the ``Board`` and the number of moves made before it.'''
+	_, move_count, squares, passant, taken = SNAPSHOT.unpack(record)
+	pieces = [None] + [(color, shape) for color in util.colors for shape in util.shapes]  # index 0 is an empty square
+	return Board(
+		[[None if byte == 0 else pieces[byte & 0x7F] + (bool(byte & 0x80),) for byte in squares[y * 8:y * 8 + 8]] for y in range(8)],
+		decode_square(passant),
+		{color: {shape: taken[c * len(util.shapes) + s] for s, shape in enumerate(util.shapes)} for c, color in enumerate(util.colors)}
+	), move_count
+
+
+def read_journal(path):
+	'''Read a journal, returning the final ``Board``, the list of moves, and the length of the journal up to the last complete record.
+	Only the moves after the last snapshot are replayed on the board. A record cut off by a crash (or anything unrecognizable) ends the journal there.'''
+	with open(path, 'rb') as journal_f:
+		data = journal_f.read()
+	if data[:len(MAGIC)] != MAGIC: raise ValueError(f'{path} is not a game journal')
+	board_model, snapshot_at = Board.initial(), 0  # with no snapshot, everything is replayed from the starting position
+	moves = []
+	offset = len(MAGIC)
+	while offset < len(data):
+		record_struct = RECORDS.get(data[offset])
+		# stop at an unknown tag or a record that is missing its end.
+		if record_struct is None or offset + record_struct.size > len(data): break
+		record = data[offset:offset + record_struct.size]
+		offset += record_struct.size
+		if record_struct is SNAPSHOT:
+			board_model, snapshot_at = decode_snapshot(record)
+		else:
+			moves.append(decode_move(record))
+	# replay the tail after the snapshot.
+	for move in moves[snapshot_at:]:
+		board_model.apply(move)
+	return board_model, moves, offset
+
+
+class Journal:
+	'''An append-only, crash-safe record of a game. Every move is written as soon as it's made, and the position is snapshotted periodically so that resuming
+	only needs to replay the moves since the last snapshot. Records are flushed to the OS immediately (which survives the program crashing), but `fsync`ed
+	(which survives the whole computer crashing) only every few records, since that is what's actually slow.'''
+
+	def __init__(self, path, fsync_every=8, snapshot_every=32):
+		'''Make a journal. Nothing is opened until ``start`` or ``resume`` is called.
+		Arguments:
+		path: where the journal is stored
+		fsync_every: how many records to write before each `fsync`
+		snapshot_every: how many moves to make between snapshots'''
+		self.path = path
+		self.fsync_every = fsync_every
+		self.snapshot_every = snapshot_every
+		self.file = None
+		self.move_count = 0
+		self.unsynced = 0
+
+	def start(self):
+		'''Start a new game, throwing away whatever was in the journal.'''
+		self.close()
+		self.file = open(self.path, 'wb')
+		self.move_count = 0
+		self.write(MAGIC)
+		self.sync()
+
+	def resume(self):
+		'''Pick up the game in the journal, returning the ``Board`` and the list of moves. Appending continues after the last complete record.'''
+		self.close()
+		board_model, moves, length = read_journal(self.path)
+		self.file = open(self.path, 'r+b')
+		# throw away anything after the last complete record so that new records don't end up behind garbage.
+		self.file.truncate(length)
+		self.file.seek(length)
+		self.move_count = len(moves)
+		return board_model, moves
+
+	def record(self, move, board_model):
+		'''Append a move. ``board_model`` must already have the move applied, since it is what gets snapshotted.'''
+		self.write(encode_move(move))
+		self.move_count += 1
+		if self.move_count % self.snapshot_every == 0:
+			self.write(encode_snapshot(board_model, self.move_count))
+		if self.unsynced >= self.fsync_every:
+			self.sync()
+
+	def write(self, record):
+		'''Write a record and hand it to the OS.'''
+		self.file.write(record)
+		self.file.flush()
+		self.unsynced += 1
+
+	def sync(self):
+		'''Make sure everything written so far is on the disk.'''
+		os.fsync(self.file.fileno())
+		self.unsynced = 0
+
+	def close(self):
+		'''Sync and close the journal, if it's open.'''
+		if self.file is not None:
+			self.sync()
+			self.file.close()
+			self.file = None
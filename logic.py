@@ -263,8 +263,9 @@ def move_is_valid(turtle_arr, from_pos, to_pos):
 
 
 selection_coord = None  # initialize with no selection (what None indicates)
-def onclick(selection_trtl, is_blacks_turn, piece_arr, x, y, board_size):  # noqa: E302 (two lines around top-level defs) - related
-	'''This is the second most important function in this file. It handles the move selection and the manipulation of the piece array.'''
+def onclick(selection_trtl, is_blacks_turn, piece_arr, x, y, board_size, promotion=None):  # noqa: E302 (two lines around top-level defs) - related
+	'''This is the second most important function in this file. It handles the move selection and the manipulation of the piece array.
+	If a pawn is promoted, the player is asked what to promote it to, unless ``promotion`` is given (used when the engine makes a move).'''
 	# NOTE: the x and y arguments are ints from 0 to 7 as opposed to raw coords.
 	global selection_coord  # allow us to modify this from within the function
 	if selection_coord is None:
@@ -323,7 +324,7 @@ def onclick(selection_trtl, is_blacks_turn, piece_arr, x, y, board_size):  # noq
 				# these special conditions below don't necesitate a separate section, and can instead be integrated into the normal move handler.
 				promoting = result_of_check == 'promotion'  # pawn being promoted (will trigger dialog to pick promotion)
 				make_passant = result_of_check == 'make-passant'  # a pawn is moving two spaces (necessitates the creation of a ``PassantReference``)
-				if promoting:  # handle the promotion
+				if promoting and promotion is None:  # handle the promotion, unless the caller already chose it
 					# this is the piece that the pawn is being promoted to
 					promotion = ''
 					# ``util.promotable_to`` is the list of pieces that a pawn can be promoted to (rook, knight, bishop, queen). Loop while the selected promotion is not
@@ -338,7 +339,10 @@ def onclick(selection_trtl, is_blacks_turn, piece_arr, x, y, board_size):  # noq
 						else: promotion = choice.lower()  # ignore case
 				killed_piece = piece_arr[y][x]  # save the captured piece since it is replaced by the moving piece further along
 				# if ``killed_piece`` is an en passant reference, then the pawn it references should be the one to be captured. This can easily be accomplished:
-				if isinstance(killed_piece, PassantReference): killed_piece = killed_piece.trtl  # replace ``killed_piece`` with the piece that it references.
+				if isinstance(killed_piece, PassantReference):
+					killed_piece = killed_piece.trtl  # replace ``killed_piece`` with the piece that it references.
+					# that pawn isn't on the destination square, so it has to be taken off the board where it is.
+					piece_arr = [[(None if piece is killed_piece else piece) for piece in row] for row in piece_arr]
 				moving_shape = piece_arr[selection_coord[1]][selection_coord[0]].shape()  # store for use throughout the next segments.
 				# another reason that the castling needed to be separate was that it has a completely different algebraic notation, and therefore a different class
 				# to record it in the move history. Here we use the more generic ``RecordedMove`` to record information about the move.
@@ -1,47 +1,102 @@
 import util
 import logic
+import engine
+import journal
 import turtle
+import argparse
+import textwrap
+import time
 import gc
+from board import Board
 
-# -- PRINT INSTRUCTIONS
+# -- READ ARGUMENTS
 
-# the instructions are stored in a file since they are a decent amount of text.
-with open('instructions.txt', 'r') as instructions_f:
-	# using the open file, loop through it (files are `Iterable`s.)
-	for line in instructions_f:
-		# for each line, print the line. Have `print` add no ending since there is already a line ending from the file.
-		print(line, end='')
-	# wait for the user to press Enter. This is accomplished by asking for input without an actual prompt.
-	input('')
+parser = argparse.ArgumentParser(description='Chess Refined')
+parser.add_argument('--resume', action='store_true', help='pick up the last game from its journal instead of starting a new one')
+parser.add_argument('--size', type=int, default=600, help='the size of the board in pixels (default: 600)')
+parser.add_argument('--engine', action='store_true', help='play against the engine, which plays black')
+parser.add_argument('--movetime', type=float, default=2, help='how long the engine thinks about each move, in seconds (default: 2)')
+args = parser.parse_args()
+
+# -- MEASURE STARTUP
+
+# how long each phase of the startup takes is measured and printed once the game is ready.
+phase_start = startup_start = time.perf_counter()
+phase_times = []
+def end_phase(name):  # noqa: E302 (two lines before function) - belongs with the variables above
+	'''Record how long the phase called ``name`` took, and start timing the next one.'''
+	global phase_start
+	now = time.perf_counter()
+	phase_times.append((name, now - phase_start))
+	phase_start = now
 
-# -- BEGIN GAME
+
+# -- SHOW INSTRUCTIONS
 
 # get a reference to the screen.
 win = turtle.Screen()
+# turn off animation while the game is set up. Drawing everything at once is far faster than watching the board get drawn and every piece glide into place.
+win.tracer(0)
+
+# the instructions are stored in a file since they are a decent amount of text. They are shown in the window over the board until the first click.
+with open('instructions.txt', 'r') as instructions_f:
+	# wrap the long lines so that the instructions fit over the board. The banner's lines are shorter than this, so they're left alone.
+	instructions = '\n'.join(textwrap.fill(line, 72) if line.strip() else '' for line in instructions_f.read().splitlines())
+# make the turtle that shows the instructions.
+instructions_writer = turtle.Turtle()
+util.setup_internal_turtle(instructions_writer)
+util.draw_instructions(instructions_writer, instructions, ('Courier', 10, 'normal'))
+instructions_shown = True  # the instructions are closed by clicking (see ``click_handler``)
+# show the window with the instructions right away, before anything else is set up.
+win.update()
+end_phase('window')
+
+# -- BEGIN GAME
+
+# every move is recorded in the journal so that a game can be resumed if the program stops (see ``journal.Journal``).
+game_journal = journal.Journal('game.journal')
+if args.resume:
+	# rebuild the board model and the move history from the journal.
+	try:
+		board_model, move_record = game_journal.resume()
+	except (FileNotFoundError, ValueError) as e:
+		# there's no journal, or the file isn't one, so there's nothing to resume.
+		print(f'Could not resume ({e}), so starting a new game.')
+		args.resume = False
+if not args.resume:
+	# start with a fresh board model and an empty journal.
+	board_model, move_record = Board.initial(), []
+	game_journal.start()
 
 # make a turtle to draw the board
 board_turtle = turtle.Turtle()
-# set it up at a very fast speed
-board_turtle.speed(10)
+# set it up at the fastest speed (animation is off while drawing anyway)
+board_turtle.speed(0)
 
-is_blacks_turn = False  # false means it's white's turn
+is_blacks_turn = len(move_record) % 2 == 1  # false means it's white's turn. White always moves first, so an odd number of moves means it's black's turn.
+
+# the engine, if it's playing (see ``engine.Opponent``). Otherwise `None`, and both players click to move.
+opponent = engine.Opponent('dark', args.movetime) if args.engine else None
 
 # store the font config in a variable as opposed to having it all over the place as a literal.
 FONT_SIZE = 20
 FONT = ('sans-serif', FONT_SIZE, 'normal')
 
-# register the icons for the pieces with the screen (see the definition for much more info).
-util.register_piece_shapes(win)
+# store the board size in a variable as opposed to having it all over the place as a literal.
+board_size = args.size
+
+# register the icons for the pieces with the screen, sized for the board (see the definition for much more info).
+util.register_piece_shapes(win, board_size)
+
+# the turn indicator goes just outside the border, above or below the board. This is 370 for a board size of 600.
+turn_indicator_pos = (0, board_size / 2 + 70)
 
 # make the indicator that shows whose turn it is.
 turn_indicator = turtle.Turtle()
 # set it up as an internal turtle (pen up, hidden, speed 0).
 util.setup_internal_turtle(turn_indicator)
 # use the turtle to draw the first turn indicator.
-util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, (0, 370))
-
-# store the board size in a variable as opposed to having it all over the place as a literal.
-board_size = 600
+util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, turn_indicator_pos)
 
 # register the restart button shape (``util.register_piece_shapes`` only registers the chess pieces.)
 win.register_shape('restart_button.gif')
@@ -54,14 +109,17 @@ restart_button.goto(-(board_size / 2) - 100, 0)
 def restart_program():  # noqa: E302 (two lines before function) - Should be an anonymous fn
 	'''A function to gather all the actions necessary to reset the data and interface. I considered combining this with the initialization you will see below,
 	but decided in the end that the processes are different enough that they would be more confusing that it's worth if they were combined.'''
-	global board, taken_pieces, indicators_writer, taken_indicators, move_record, is_blacks_turn, turn_indicator, logic  # many, many variables to modify...
+	global board, board_model, indicator_writers, taken_indicators, move_record, is_blacks_turn, turn_indicator, logic  # many, many variables to modify...
+	# stop the engine from thinking about the old game, and have it forget what it learned there.
+	if opponent is not None: opponent.new_game()
+	# turn off animation while the board is rebuilt, so that it appears all at once (like at startup).
+	win.tracer(0)
 	# reset the selection...
 	logic.selection_coord = None
 	# ...and update the indicator.
 	util.update_selection(selection_indicator, logic.selection_coord, board_size)
-	# clear the writers. Their indicators will be rewritten later.
+	# clear the turn indicator. It will be rewritten later.
 	turn_indicator.clear()
-	indicators_writer.clear()
 	# hide and then delete every piece.
 	for row in board:
 		# for each row in the board...
@@ -77,61 +135,120 @@ def restart_program():  # noqa: E302 (two lines before function) - Should be an
 	board = util.create_full_board(win)
 	# tell the garbage collector to collect all of the turtles with no more references.
 	gc.collect()
-	# reset the dict that tracks the taken pieces for each player.
-	taken_pieces = {color: {shape: 0 for shape in util.shapes} for color in util.colors}
+	# reset the move history, the board model (which also tracks the taken pieces for each player), and the journal.
+	move_record = []
+	board_model = Board.initial()
+	game_journal.start()
 	# move the new board pieces to their proper positions.
 	util.move_board_pieces(board, board_size, board_size / 8)
 	# update the taken piece indicators (all of them are zero).
-	util.update_piece_indicators(indicators_writer, ('sans-serif', 10, 'normal'), taken_pieces, taken_indicators)
-	# reset the move history.
-	move_record = []
+	util.update_piece_indicators(indicator_writers, ('sans-serif', 10, 'normal'), board_model.taken, taken_indicators)
 	# make it be white's turn again.
 	is_blacks_turn = False
 	# write the indicator that shows whose turn it is (white's).
-	util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, (0, 370))
+	util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, turn_indicator_pos)
+	# show the new board and turn animation back on.
+	win.update()
+	win.tracer(1)
 # finally, bind this function to clicking the restart button from before.
 restart_button.onclick(lambda *_: restart_program())  # noqa: E305 (two lines after function) - Should be an anonymous fn
 
+end_phase('journal and assets')
+
 # draw the board (checkedboard and borders).
 util.draw_board(board_turtle, board_size)
 
-# make the pieces.
-board = util.create_full_board(win)
-# make the dict that keeps track of the taken pieces for each player.
-taken_pieces = {color: {shape: 0 for shape in util.shapes} for color in util.colors}
+if args.resume:
+	# make the pieces as they are in the board model.
+	board = board_model.create_turtles(win)
+else:
+	# make the pieces.
+	board = util.create_full_board(win)
 # move the pieces on the board to their proper positions (see the def for more info).
 util.move_board_pieces(board, board_size, board_size / 8)
+end_phase('board')
 
-# make the writer for the taken piece indicators.
-indicators_writer = turtle.Turtle()
-# set it up as an internal turtle (pen up, hidden, speed 0)
-util.setup_internal_turtle(indicators_writer)
 # create the turtles to show the icons for the taken indicators.
 taken_indicators = util.create_taken_piece_indicator(win)
+# make a writer for each taken piece indicator (see the def for more info).
+indicator_writers = util.create_piece_indicator_writers(taken_indicators)
 
 # move the taken piece indicators to their proper positions.
 util.move_piece_indicators(board_size, taken_indicators)
-# write the indicators above the pieces that were just moved, using the writer turtle that was just created.
-util.update_piece_indicators(indicators_writer, ('sans-serif', 10, 'normal'), taken_pieces, taken_indicators)
+# write the indicators above the pieces that were just moved, using the writer turtles that were just created. The board model keeps track of the taken pieces.
+util.update_piece_indicators(indicator_writers, ('sans-serif', 10, 'normal'), board_model.taken, taken_indicators)
 
-# register the selection halo shape (``util.register_piece_shapes`` only registers the chess pieces).
-win.register_shape('selection.gif')
-# make the turtle that is the selection indicator.
-selection_indicator = turtle.Turtle(shape='selection.gif')
+# make the turtle that is the selection indicator, registering the selection halo shape first (``util.register_piece_shapes`` only registers the chess pieces).
+selection_indicator = turtle.Turtle(shape=util.register_selection_shape(win, board_size))
 # set is up as an internal turtle (pen up, hidden, speed 0). The turtle is hidden until a selection is made.
 util.setup_internal_turtle(selection_indicator)
 
 # show the restart button now that the whole interface is set up.
 restart_button.showturtle()
+end_phase('interface')
+
+# make sure the instructions are on top of the board. Redrawing them puts them last, which puts them on top.
+util.draw_instructions(instructions_writer, instructions, ('Courier', 10, 'normal'))
+# show everything that was set up...
+win.update()
+# ...and turn animation back on, so that moves glide across the board.
+win.tracer(1)
+end_phase('display')
+# report the timings.
+total_time = time.perf_counter() - startup_start
+print('Startup: ' + ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in phase_times) + f', total {total_time * 1000:.0f} ms')
 
 
-# create an empty list to hold the move history.
-move_record = []
+def process_move(ret):
+	'''Process a move that ``logic.onclick`` made, whether the player or the engine made it: record it, update the interface, and change the turn.'''
+	global board, is_blacks_turn, board_model  # many variables to be modified...
+	# unpack the return value. The function returns the captured piece if there was one, otherwise `None`; the modified piece array; and the...
+	# ...``logic.RecordedMove`` or ``logic.RecordedCastle`` that will represent the move in the move history.
+	killed_piece, board, resulting_move = ret
+	# add the move object to the move history...
+	move_record.append(resulting_move)
+	# ...make it on the board model, which counts any capture and tells us what was captured...
+	killed = board_model.apply(resulting_move)
+	# ...and record it in the journal.
+	game_journal.record(resulting_move, board_model)
+	# check whether a piece was captured in the move.
+	if isinstance(killed_piece, turtle.Turtle):
+		# if a piece was captured, we need to process the implications.
+		# first move the pieces of the board (this is in common).
+		util.move_board_pieces(board, board_size, board_size / 8)
+		# then get the color and the name/shape/type of the piece that was captured from the board model.
+		killed_color, killed_piece_name, _ = killed
+		# move the piece to its indicator and then hide it, making it appear to dissolve into that indicator in a very visually descriptive way.
+		killed_piece.goto(taken_indicators[killed_color][killed_piece_name].pos())
+		killed_piece.hideturtle()
+		# change the turn. This is done before redoing the indicators to prevent the person who just moved from making another move while the indicators are...
+		# ...updating. (also in common)
+		is_blacks_turn = not is_blacks_turn
+		# update the indicators, starting with the indicator of whose turn it is to reflect the change just made... (last part in common)
+		util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, turn_indicator_pos)
+		# ...then moving on to the one captured piece indicator that changed (the board model already counted the just-captured piece).
+		util.update_taken_count(indicator_writers, ('sans-serif', 10, 'normal'), board_model.taken, taken_indicators, killed_color, killed_piece_name)
+	else:
+		# if no piece was captured, there are only a few operations we need to do. Some code is duplicated here, but the order matters so this couldn't be...
+		# ...converted to a function unfortunately.
+		# first move the pieces of the board
+		util.move_board_pieces(board, board_size, board_size / 8)
+		# then change the turn, before updating the turn indicator for the reason stated above.
+		is_blacks_turn = not is_blacks_turn
+		# finally update the indicator of whose turn it is to reflect that change.
+		util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, turn_indicator_pos)
 
 
 def click_handler(x, y):
 	'''Handles any move the player makes. Translates raw coordinates into clicked squares and calls ``logic.onclick``.'''
-	global selection_indicator, board, is_blacks_turn, taken_pieces  # many variables to be modified...
+	global selection_indicator, instructions_shown  # may be modified
+	# the first click closes the instructions instead of being a move.
+	if instructions_shown:
+		instructions_writer.clear()
+		instructions_shown = False
+		return
+	# while the engine is deciding on its move, ignore clicks.
+	if opponent is not None and is_blacks_turn == (opponent.color == 'dark'): return
 	# the edge of the board is half of the board's size, since the board is centered around (0, 0).
 	board_edge = board_size / 2
 	# the squares are each an eighth of the board since the board has eight squares.
@@ -150,43 +267,65 @@ def click_handler(x, y):
 		)
 		# check if a move was made (the function will return None if there was no move).
 		if ret is not None:
-			# if a move was made, we can now process that move.
-			# unpack the return value. The function returns the captured piece if there was one, otherwise `None`; the modified piece array; and the...
-			# ...``logic.RecordedMove`` or ``logic.RecordedCastle`` that will represent the move in the move history.
-			killed_piece, board, resulting_move = ret
-			# add the move object to the move history.
-			move_record.append(resulting_move)
-			# check whether a piece was captured in the move.
-			if isinstance(killed_piece, turtle.Turtle):
-				# if a piece was captured, we need to process the implications.
-				# first move the pieces of the board (this is in common).
-				util.move_board_pieces(board, board_size, board_size / 8)
-				# then find the color and the name/shape/type of the piece that was captured.
-				killed_color = logic.convert_file_to_color(killed_piece.shape())  # stored in a variable since it used multiple times.
-				killed_piece_name = logic.convert_file_to_name(killed_piece.shape())  # ^
-				# move the piece to its indicator and then hide it, making it appear to dissolve into that indicator in a very visually descriptive way.
-				killed_piece.goto(taken_indicators[killed_color][killed_piece_name].pos())
-				killed_piece.hideturtle()
-				# increment the counter for that name/shape/type and color of captured piece.
-				taken_pieces[killed_color][killed_piece_name] += 1
-				# change the turn. This is done before redoing the indicators to prevent the person who just moved from making another move while the indicators are...
-				# ...updating. (also in common)
-				is_blacks_turn = not is_blacks_turn
-				# update the indicators, starting with the indicator of whose turn it is to reflect the change just made... (last part in common)
-				util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, (0, 370))
-				# ...then moving on that of the captured pieces (now updated with the just-captured piece).
-				util.update_piece_indicators(indicators_writer, ('sans-serif', 10, 'normal'), taken_pieces, taken_indicators)
-			else:
-				# if no piece was captured, there are only a few operations we need to do. Some code is duplicated here, but the order matters so this couldn't be...
-				# ...converted to a function unfortunately.
-				# first move the pieces of the board
-				util.move_board_pieces(board, board_size, board_size / 8)
-				# then change the turn, before updating the turn indicator for the reason stated above.
-				is_blacks_turn = not is_blacks_turn
-				# finally update the indicator of whose turn it is to reflect that change.
-				util.draw_turn_indicator(turn_indicator, is_blacks_turn, FONT, (0, 370))
+			# if a move was made, we can now process that move (see the def for more info).
+			process_move(ret)
+			if opponent is not None:
+				# it's the engine's turn now. Tell it the move (it may have been pondering on exactly this one), and start checking for its reply.
+				opponent.opponent_moved(move_record[-1], board_model)
+				win.ontimer(poll_opponent, 50)
 		# (if no move was made then we're done here and can exit.)
-# attach this handler to the window's click event.
+
+
+def poll_opponent():
+	'''Check whether the engine has decided on its move. If it has, make the move by clicking for it; if not, check again soon.'''
+	# if the engine's turn is over (the game was restarted), stop checking.
+	if is_blacks_turn != (opponent.color == 'dark'): return
+	result = opponent.poll()
+	if result is None:
+		# still thinking.
+		win.ontimer(poll_opponent, 50)
+		return
+	best_move, pv = result
+	if best_move is None:
+		# the engine found no move. Either its king has been captured, which ends the game...
+		if board_model.find_king(opponent.color) is None:
+			util.draw_game_over(turn_indicator, f"{'White' if opponent.color == 'dark' else 'Black'} Wins", is_blacks_turn, FONT, turn_indicator_pos)
+			return
+		# ...or every move leaves its king in check. Standard chess calls that checkmate or stalemate, but this game has neither, so the engine still has to
+		# move. Make the most promising move that the game hasn't already turned down.
+		moves = [move for move in board_model.moves(opponent.color) if engine.move_key(move) not in opponent.rejected]
+		if not moves:
+			# nothing can move at all, so the game can't go on.
+			util.draw_game_over(turn_indicator, f"{'Black' if is_blacks_turn else 'White'} Can’t Move", is_blacks_turn, FONT, turn_indicator_pos)
+			return
+		best_move = min(moves, key=lambda move: engine.move_order(board_model, move, None))
+		pv = [best_move]
+	if isinstance(best_move, logic.RecordedCastle):
+		# castling is clicked as the king and then the rook, on the color's end row.
+		y = 0 if best_move.color == 'light' else 7
+		clicks = [(4, y), (7 if best_move.is_kingside else 0, y)]
+	else:
+		clicks = [best_move.from_pos, best_move.to_pos]
+	# the first click selects the piece, and the second makes the move (with the engine's promotion, so that nobody is asked).
+	logic.onclick(selection_indicator, is_blacks_turn, board, *clicks[0], board_size)
+	ret = logic.onclick(selection_indicator, is_blacks_turn, board, *clicks[1], board_size, getattr(best_move, 'promotion', None))
+	if ret is None:
+		# the game didn't accept the move, so take back the selection and have the engine think again without it.
+		logic.selection_coord = None
+		util.update_selection(selection_indicator, logic.selection_coord, board_size)
+		opponent.move_rejected(board_model, best_move)
+		win.ontimer(poll_opponent, 50)
+		return
+	process_move(ret)
+	# now ponder on the player's time, guessing that they'll play the reply the engine expects.
+	opponent.ponder(board_model, pv)
+
+
+# if the engine is to move in a resumed game, start it thinking.
+if opponent is not None and is_blacks_turn == (opponent.color == 'dark'):
+	opponent.start_move(board_model)
+	win.ontimer(poll_opponent, 50)
+# attach the click handler to the window's click event.
 win.onclick(click_handler)  # noqa: E305 (two lines around top-level defs) - ↓
 # function defined only due to Python's insistence to not allow inline function definitions except as exceedingly restricted lambdas.
 
@@ -197,3 +336,6 @@ win.onkeypress(lambda: logic.print_history(move_record), 'h')
 win.listen()
 # make the window persist in its event loop.
 win.mainloop()
+# once the window is closed, stop the engine and make sure the end of the game is safely in the journal.
+if opponent is not None: opponent.stop()
+game_journal.close()
@@ -0,0 +1,163 @@
+import util
+import turtle
+import argparse
+import math
+from board import Board
+
+# -- READ ARGUMENTS
+
+parser = argparse.ArgumentParser(description='Chess Refined: simultaneous exhibition, with many games on the screen at once')
+parser.add_argument('--boards', type=int, default=16, help='the number of games to play at once (default: 16)')
+parser.add_argument('--size', type=int, default=160, help='the size of each board in pixels (default: 160)')
+args = parser.parse_args()
+
+board_size = args.size
+FONT = ('sans-serif', 10, 'normal')
+
+# each board takes up a cell of the grid. The borders stick out 20 on each side (see ``util.draw_board``), and there is room for a status line below.
+cell_width = board_size + 60
+cell_height = board_size + 80
+# lay the boards out in a grid that's as close to square as possible.
+columns = math.ceil(math.sqrt(args.boards))
+rows = math.ceil(args.boards / columns)
+
+
+class SimulBoard:
+	'''One of the games in the exhibition. The pieces are stamps instead of turtles: each square remembers what is drawn on it, and only the squares that
+	changed are stamped again when the board is drawn.'''
+
+	def __init__(self, center):
+		'''Start a game on a board centered on ``center``.'''
+		self.center = center
+		self.board_model = Board.initial()
+		self.is_blacks_turn = False
+		self.move_record = []
+		self.winner = None  # the color that captured the other king, once the game is over
+		self.drawn = [[None for __ in range(8)] for _ in range(8)]  # the (color, shape) drawn on each square
+		self.stamps = [[None for __ in range(8)] for _ in range(8)]  # the id of the stamp on each square
+		self.dirty = True  # whether the board needs to be drawn again
+		# each board writes its own status line, so that one board's status can change without touching the others'.
+		self.writer = turtle.Turtle()
+		util.setup_internal_turtle(self.writer)
+
+	def square_at(self, x, y):
+		'''Translate raw coordinates into the indices of the square on this board, or `None` if the coordinates are not on this board.'''
+		board_x = x - self.center[0] + board_size / 2  # distance from the left edge
+		board_y = -(y - self.center[1]) + board_size / 2  # distance from the top edge
+		if 0 <= board_x < board_size and 0 <= board_y < board_size:
+			return int(board_x // (board_size / 8)), int(board_y // (board_size / 8))
+		return None
+
+	def make_move(self, move):
+		'''Make a move on this board and hand the turn to the other player.'''
+		self.move_record.append(move)
+		killed = self.board_model.apply(move)
+		if killed is not None and killed[1] == 'king':
+			# capturing the king ends the game.
+			self.winner = 'dark' if self.is_blacks_turn else 'light'
+		self.is_blacks_turn = not self.is_blacks_turn
+		self.dirty = True
+
+	def draw(self, stamper):
+		'''Stamp the squares that changed since the last time the board was drawn, and rewrite the status line.'''
+		for y, row in enumerate(self.board_model.squares):
+			for x, square in enumerate(row):
+				piece = None if square is None else square[:2]  # the moved flag doesn't change what the piece looks like
+				if piece == self.drawn[y][x]: continue
+				# something changed, so remove the old stamp (if there is one) and stamp the new piece (if there is one).
+				if self.stamps[y][x] is not None: stamper.clearstamp(self.stamps[y][x])
+				self.stamps[y][x] = None
+				if piece is not None:
+					stamper.shape(util.get_piece_path(*piece))
+					stamper.goto(util.square_center(board_size, x, y, self.center))
+					self.stamps[y][x] = stamper.stamp()
+				self.drawn[y][x] = piece
+		# the status line goes below the bottom border.
+		self.writer.clear()
+		self.writer.goto(self.center[0], self.center[1] - board_size / 2 - 25 - FONT[1] * 1.5)
+		if self.winner is not None:
+			status = f"{'White' if self.winner == 'light' else 'Black'} wins"
+		else:
+			status = f"{'Black' if self.is_blacks_turn else 'White'}’s turn · move {len(self.move_record) // 2 + 1}"
+		self.writer.write(status, align='center', font=FONT)
+		self.dirty = False
+
+
+# -- BEGIN EXHIBITION
+
+# get a reference to the screen, and make it big enough for every board.
+win = turtle.Screen()
+win.setup(columns * cell_width + 40, rows * cell_height + 40)
+# everything is drawn in frames (see ``draw_frame``), so turn off animation.
+win.tracer(0)
+
+# register the icons for the pieces and the selection halo, sized for the boards.
+util.register_piece_shapes(win, board_size)
+selection_indicator = turtle.Turtle(shape=util.register_selection_shape(win, board_size))
+util.setup_internal_turtle(selection_indicator)
+
+# make the boards, centering the grid on the middle of the window.
+boards = [
+	SimulBoard(((i % columns - (columns - 1) / 2) * cell_width, ((rows - 1) / 2 - i // columns) * cell_height + 10))
+	for i in range(args.boards)
+]
+
+# draw the checkerboards. They never change, so this only happens once.
+board_turtle = turtle.Turtle()
+for simul_board in boards:
+	util.draw_board(board_turtle, board_size, simul_board.center)
+
+# make the turtle that stamps the pieces. It's never shown itself.
+stamper = turtle.Turtle()
+util.setup_internal_turtle(stamper)
+
+# the current selection: the board it's on and the indices of the square, or `None` if nothing is selected.
+selection = None
+
+
+def draw_frame():
+	'''Draw every board that changed, and the selection, then show all of it at once.'''
+	for simul_board in boards:
+		if simul_board.dirty: simul_board.draw(stamper)
+	if selection is None:
+		util.update_selection(selection_indicator, None, board_size)
+	else:
+		util.update_selection(selection_indicator, selection[1], board_size, selection[0].center)
+	win.update()
+
+
+def click_handler(x, y):
+	'''Handles any move the player makes on any of the boards. Works like ``logic.onclick``: the first click selects a piece and the second moves it.'''
+	global selection
+	# find the board that was clicked, and the square on it.
+	for simul_board in boards:
+		coord = simul_board.square_at(x, y)
+		if coord is not None: break
+	else:
+		return  # the click wasn't on any board
+	color = 'dark' if simul_board.is_blacks_turn else 'light'
+	square = simul_board.board_model.squares[coord[1]][coord[0]]
+	if selection is not None and selection[0] is simul_board and selection[1] != coord:
+		# this is the second click on the same board, so try to make the move.
+		move = simul_board.board_model.find_move(color, selection[1], coord)
+		if move is not None:
+			simul_board.make_move(move)
+			selection = None
+		elif square is not None and square[0] == color:
+			# not a move, but it is one of the player's own pieces, so select it instead.
+			selection = (simul_board, coord)
+	elif selection is not None and selection[0] is simul_board:
+		# clicking the selection again removes it.
+		selection = None
+	elif simul_board.winner is None and square is not None and square[0] == color:
+		# select a piece of the player whose turn it is on that board.
+		selection = (simul_board, coord)
+	draw_frame()
+
+
+# draw the first frame, with all of the pieces.
+draw_frame()
+# attach the handler to the window's click event.
+win.onclick(click_handler)
+# make the window persist in its event loop.
+win.mainloop()
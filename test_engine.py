@@ -0,0 +1,57 @@
+import engine
+import uci
+from board import Board
+
+# the standard perft positions (from the Chess Programming Wiki) and the number of legal move sequences of each depth from them.
+perft_positions = [
+	(uci.START_FEN, [20, 400, 8902]),
+	('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039]),
+	('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812]),
+	('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264]),
+]
+
+
+def perft(board_model, color, depth):
+	'''Count the legal move sequences of ``depth`` moves from the position.'''
+	if depth == 0: return 1
+	return sum(perft(child, engine.other_color[color], depth - 1) for _, child in engine.legal_moves(board_model, color))
+
+
+def test_perft():
+	for fen, counts in perft_positions:
+		board_model, color = uci.parse_fen(fen)
+		for depth, count in enumerate(counts, 1):
+			assert perft(board_model, color, depth) == count, (fen, depth)
+
+
+def test_finds_mate_in_one():
+	board_model, color = uci.parse_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+	best_move, pv = engine.Engine().search(board_model, color, depth=3)
+	assert uci.move_to_uci(best_move) == 'a1a8'
+
+
+def test_copy_keeps_material():
+	# the material is carried over by ``copy`` and then kept up to date by ``apply``, so it has to match a recount after any moves.
+	board_model, color = uci.parse_fen('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1')
+	for _ in range(6):
+		children = engine.legal_moves(board_model, color)
+		if not children: break
+		# prefer captures and promotions, since they're what change the material.
+		move, board_model = min(children, key=lambda child: engine.move_order(board_model, child[0], None))
+		recounted = Board(board_model.squares, board_model.passant, board_model.taken)
+		assert board_model.material == recounted.material
+		color = engine.other_color[color]
+
+
+def test_table_keeps_deeper_results():
+	# one slot, so every position competes for it. Within a search, a shallower result doesn't replace a deeper one, but a later search's result does.
+	search_engine = engine.Engine(table_mb=0)
+	search_engine.table = [None]
+	board_model, color = uci.parse_fen(uci.START_FEN)
+	move = next(board_model.moves(color))
+	search_engine.store(b'deep', 5, 0, engine.EXACT, move)
+	search_engine.store(b'shallow', 2, 0, engine.EXACT, move)
+	assert search_engine.probe(b'deep') is not None and search_engine.probe(b'shallow') is None
+	search_engine.generation += 1
+	search_engine.store(b'shallow', 2, 0, engine.EXACT, move)
+	assert search_engine.probe(b'shallow') is not None
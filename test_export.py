@@ -0,0 +1,29 @@
+import pytest
+np = pytest.importorskip('numpy')
+import export  # noqa: E402 (import not at top) - needs numpy
+from test_journal import random_game  # noqa: E402 - ^
+
+
+def test_write_and_read(tmp_path):
+	writer = export.ShardWriter(tmp_path, shard_size=8)
+	moves, _ = random_game(3, 20)
+	writer.add_game(moves, result=1)
+	writer.close()
+	assert writer.shard_count == -(-len(moves) // 8)  # full shards of 8, and a shorter last one
+	reader = export.ShardReader(tmp_path)
+	assert len(reader) == len(moves)
+	assert [int(move) for move in np.concatenate(list(reader.batches(4)))['move']] == [export.encode_move(move) for move in moves]
+	# the first record is the starting position: 16 pieces of each color, with white to move.
+	first = reader.batch(0, 1)[0]
+	assert first['planes'].sum() == 32 and first['side'] == 0 and first['result'] == 1
+	# batches are views of the memory-mapped shards, not copies.
+	batch = reader.batch(9, 4)
+	assert len(batch) == 4 and isinstance(batch.base, np.memmap)
+
+
+def test_refuses_old_shards(tmp_path):
+	writer = export.ShardWriter(tmp_path, shard_size=8)
+	writer.add_game(random_game(4, 4)[0])
+	writer.close()
+	with pytest.raises(FileExistsError):
+		export.ShardWriter(tmp_path)
@@ -0,0 +1,65 @@
+import random
+import pytest
+import journal
+from board import Board
+
+
+def random_game(seed, length):
+	'''Play random moves from the starting position, returning the moves and the final board. Stops early if a king is captured. Also used by the other
+	tests that need a game.'''
+	rng = random.Random(seed)
+	board_model, moves = Board.initial(), []
+	for i in range(length):
+		move = rng.choice(list(board_model.moves('dark' if i % 2 else 'light')))
+		moves.append(move)
+		killed = board_model.apply(move)
+		if killed is not None and killed[1] == 'king': break
+	return moves, board_model
+
+
+def write_game(path, moves):
+	'''Record ``moves`` in a new journal at ``path``, the way the game does.'''
+	game_journal = journal.Journal(path, snapshot_every=16)
+	game_journal.start()
+	board_model = Board.initial()
+	for move in moves:
+		board_model.apply(move)
+		game_journal.record(move, board_model)
+	game_journal.close()
+
+
+def test_round_trip(tmp_path):
+	moves, final_board = random_game(1, 60)
+	write_game(tmp_path / 'game.journal', moves)
+	board_model, read_moves = journal.Journal(tmp_path / 'game.journal').resume()
+	assert [str(move) for move in read_moves] == [str(move) for move in moves]
+	assert board_model.squares == final_board.squares
+	assert board_model.passant == final_board.passant
+	assert board_model.taken == final_board.taken
+
+
+def test_resume_drops_torn_tail(tmp_path):
+	path = tmp_path / 'game.journal'
+	moves, _ = random_game(2, 40)
+	write_game(path, moves)
+	# cut the last record in half, as a crash in the middle of a write would.
+	path.write_bytes(path.read_bytes()[:-2])
+	game_journal = journal.Journal(path)
+	board_model, read_moves = game_journal.resume()
+	assert len(read_moves) == len(moves) - 1
+	# the torn record is gone, so a new move is appended right after the last complete one.
+	expected = Board.initial()
+	for move in moves[:-1]:
+		expected.apply(move)
+	assert board_model.squares == expected.squares
+	expected.apply(moves[-1])
+	game_journal.record(moves[-1], expected)
+	game_journal.close()
+	assert len(journal.read_journal(path)[1]) == len(moves)
+
+
+def test_not_a_journal(tmp_path):
+	path = tmp_path / 'game.journal'
+	path.write_bytes(b'not a journal')
+	with pytest.raises(ValueError):
+		journal.Journal(path).resume()
@@ -0,0 +1,231 @@
+import sys
+import time
+import util
+import queue
+import logic
+import engine
+import threading
+from board import Board
+from string import ascii_lowercase as alphabet
+
+# the pieces' letters in FEN, as (color, shape) pairs. Uppercase is white (light) and lowercase is black (dark).
+fen_pieces = {
+	letter if color == 'light' else letter.lower(): (color, shape)
+	for color in ['light', 'dark']
+	for shape, letter in [('king', 'K'), ('queen', 'Q'), ('rook', 'R'), ('bishop', 'B'), ('knight', 'N'), ('pawn', 'P')]
+}
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+def square_name(pos):
+	'''Convert an (x, y) coordinate to a square name like ``e4``. Row 0 of the board is white's end row, which is rank 1.'''
+	return f'{alphabet[pos[0]]}{pos[1] + 1}'
+
+
+def move_to_uci(move):
+	'''Convert a ``logic.RecordedMove`` or ``logic.RecordedCastle`` to UCI's notation, which is the from square, the to square, and the promotion's letter if
+	there is one. Castling is written as the king's move.'''
+	if isinstance(move, logic.RecordedCastle):
+		y = 0 if move.color == 'light' else 7
+		return square_name((4, y)) + square_name((6 if move.is_kingside else 2, y))
+	return square_name(move.from_pos) + square_name(move.to_pos) + ('' if move.promotion is None else logic.RecordedMove.piece_characters[move.promotion].lower())
+
+
+def parse_fen(fen):
+	'''Make a board model from a position in FEN. Returns the board and the color whose turn it is.'''
+	placement, side, castling, passant = fen.split()[:4]
+	squares = [[None for __ in range(8)] for _ in range(8)]
+	# the ranks are listed from 8 down to 1, which is from row 7 down to row 0.
+	for y, rank in zip(range(7, -1, -1), placement.split('/')):
+		x = 0
+		for char in rank:
+			if char.isdigit():
+				x += int(char)  # a run of empty squares
+			else:
+				color, shape = fen_pieces[char]
+				squares[y][x] = (color, shape, True)
+				x += 1
+	# the board model knows castling rights from whether the king and rook have moved, so mark the ones that can still castle as unmoved.
+	for letter, y, rook_x in [('K', 0, 7), ('Q', 0, 0), ('k', 7, 7), ('q', 7, 0)]:
+		if letter in castling:
+			squares[y][4] = squares[y][4][:2] + (False,)
+			squares[y][rook_x] = squares[y][rook_x][:2] + (False,)
+	# FEN doesn't say what was captured, so work it out from what's missing compared to the starting position.
+	taken = {color: {shape: 0 for shape in util.shapes} for color in util.colors}
+	for row in Board.initial().squares:
+		for square in row:
+			if square is not None: taken[square[0]][square[1]] += 1
+	for row in squares:
+		for square in row:
+			if square is not None: taken[square[0]][square[1]] -= 1
+	taken = {color: {shape: max(0, count) for shape, count in counts.items()} for color, counts in taken.items()}  # promoted pieces can make counts negative
+	return Board(squares, None if passant == '-' else (alphabet.index(passant[0]), int(passant[1]) - 1), taken), 'light' if side == 'w' else 'dark'
+
+
+def find_move(board_model, color, text):
+	'''Find the move written in UCI's notation, or `None` if ``color`` can't make it.'''
+	for move in board_model.moves(color):
+		if move_to_uci(move) == text: return move
+	return None
+
+
+class UCI:
+	'''Speaks the Universal Chess Interface over stdin and stdout. Input is read on its own thread and searches run on another, so that commands like ``stop``
+	and ``isready`` are answered while the engine is thinking.'''
+
+	def __init__(self):
+		self.engine = engine.Engine()
+		self.board_model, self.color = Board.initial(), 'light'
+		self.search_thread = None
+		self.ponder_movetime = None  # the time limit to give the search on ``ponderhit``, while pondering
+		self.ponder_over = threading.Event()  # set once a pondering search may send its move (after ``ponderhit`` or ``stop``)
+		self.infinite = False  # whether the current search is ``go infinite``, which only sends its move after ``stop``
+		self.stopped = threading.Event()  # set by ``stop``, which an infinite search waits for
+		self.output_lock = threading.Lock()  # both threads write, so keep their lines from getting mixed together
+
+	def send(self, line):
+		'''Write a line to the GUI.'''
+		with self.output_lock:
+			sys.stdout.write(line + '\n')
+			sys.stdout.flush()
+
+	def read_input(self, commands):
+		'''Put every line of input into the ``commands`` queue, and `None` at the end of the input. Runs on its own thread.'''
+		for line in sys.stdin:
+			commands.put(line)
+		commands.put(None)
+
+	def run(self):
+		'''Answer commands until ``quit`` or the end of the input.'''
+		commands = queue.Queue()
+		threading.Thread(target=self.read_input, args=(commands,), daemon=True).start()
+		while True:
+			line = commands.get()
+			if line is None: break
+			tokens = line.split()
+			if not tokens: continue
+			if tokens[0] == 'quit': break
+			handler = getattr(self, f'command_{tokens[0]}', None)
+			# UCI says to ignore unknown commands.
+			if handler is None: continue
+			try:
+				handler(tokens[1:])
+			except Exception as e:
+				# a malformed command (like a bad FEN) is ignored too, instead of ending the engine in the middle of a tournament.
+				self.send(f'info string ignored {line.strip()!r}: {type(e).__name__}: {e}')
+		self.command_stop([])
+
+	def command_uci(self, args):
+		'''Identify the engine and its options.'''
+		self.send('id name Chess Refined')
+		self.send('id author Matt Fellenz')
+		self.send('option name Ponder type check default true')
+		self.send('uciok')
+
+	def command_isready(self, args):
+		'''Answer that the engine is ready. Commands are handled in order, so by the time this is read, every command before it is done.'''
+		self.send('readyok')
+
+	def command_ucinewgame(self, args):
+		'''Forget the last game, which is only the transposition table.'''
+		self.command_stop([])
+		self.engine.clear()
+
+	def command_position(self, args):
+		'''``position startpos [moves ...]`` or ``position fen <fen> [moves ...]``.'''
+		self.command_stop([])
+		moves_at = args.index('moves') if 'moves' in args else len(args)
+		self.board_model, self.color = parse_fen(START_FEN if args[0] == 'startpos' else ' '.join(args[1:moves_at]))
+		for text in args[moves_at + 1:]:
+			move = find_move(self.board_model, self.color, text)
+			if move is None: break  # an illegal move; keep the position from before it
+			self.board_model.apply(move)
+			self.color = engine.other_color[self.color]
+
+	def command_go(self, args):
+		'''``go`` with any of ``depth``, ``movetime``, ``wtime``, ``btime``, ``winc``, ``binc``, ``movestogo``, ``infinite``, and ``ponder``.'''
+		self.command_stop([])
+		limits = {name: int(value) for name, value in zip(args, args[1:]) if value.lstrip('-').isdigit()}
+		movetime = None
+		if 'movetime' in limits:
+			movetime = limits['movetime'] / 1000
+		elif ('wtime' if self.color == 'light' else 'btime') in limits:
+			# use an even share of the time left (guessing 30 moves to go if the GUI doesn't say), plus most of the increment, but never more than half.
+			left = limits['wtime' if self.color == 'light' else 'btime']
+			increment = limits.get('winc' if self.color == 'light' else 'binc', 0)
+			movetime = max(0.01, min(left / limits.get('movestogo', 30) + increment * 0.75, left / 2) / 1000)
+		# an infinite search has no time limit, whatever else is given, and can't send its move until ``stop``, even if it finishes early (say, by finding a mate).
+		self.infinite = 'infinite' in args
+		if self.infinite:
+			movetime = None
+			self.stopped.clear()
+		pondering = 'ponder' in args
+		if pondering:
+			# search on the opponent's time with no limit, until ``ponderhit`` gives it the time limit (see ``engine.Engine.ponderhit``).
+			self.ponder_movetime, movetime = movetime, None
+			self.ponder_over.clear()
+		self.engine.stop_event.clear()
+		self.search_thread = threading.Thread(target=self.search, args=(self.board_model.copy(), self.color, limits.get('depth'), movetime, pondering))
+		self.search_thread.start()
+
+	def command_ponderhit(self, args):
+		'''The opponent played the move being pondered on, so the search becomes a normal one.'''
+		if self.ponder_movetime is not None: self.engine.ponderhit(self.ponder_movetime)
+		self.ponder_movetime = None
+		self.ponder_over.set()
+
+	def command_stop(self, args):
+		'''Stop the search (if there is one) and wait for it to send its move.'''
+		if self.search_thread is not None:
+			self.engine.stop()
+			self.ponder_over.set()
+			self.stopped.set()
+			self.search_thread.join()
+			self.search_thread = None
+
+	def command_bench(self, args):
+		'''Not part of UCI: search a few positions to a fixed depth (4 unless given) and report the speed, to measure the engine the same way as others.'''
+		self.command_stop([])
+		depth = int(args[0]) if args else 4
+		positions = [
+			START_FEN,
+			'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3',
+			'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+			'8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'
+		]
+		nodes, start = 0, time.perf_counter()
+		for fen in positions:
+			self.engine.clear()
+			self.engine.stop_event.clear()
+			self.engine.search(*parse_fen(fen), depth=depth)
+			nodes += self.engine.nodes
+		elapsed = time.perf_counter() - start
+		self.send(f'info string bench depth {depth} nodes {nodes} time {int(elapsed * 1000)} nps {int(nodes / elapsed)}')
+
+	def search(self, board_model, color, depth, movetime, pondering):
+		'''Search and send the best move. Runs on its own thread.'''
+		best_move, pv = self.engine.search(board_model, color, depth, movetime, self.send_info)
+		# UCI doesn't allow sending the move while pondering, even if the search finished early.
+		if pondering: self.ponder_over.wait()
+		if self.infinite: self.stopped.wait()
+		if best_move is None:
+			self.send('bestmove 0000')  # no legal moves
+		else:
+			self.send(f'bestmove {move_to_uci(best_move)}' + (f' ponder {move_to_uci(pv[1])}' if len(pv) > 1 else ''))
+
+	def send_info(self, depth, score, nodes, elapsed, pv):
+		'''Report on a finished depth of the search (see ``engine.Engine.search``).'''
+		if abs(score) >= engine.MATE - engine.MAX_DEPTH:
+			# UCI counts mates in moves (of the side to move), not plies, and negative if the side to move is the one getting mated.
+			plies = engine.MATE - abs(score)
+			score_text = f'mate {(plies + 1) // 2 if score > 0 else -(plies // 2)}'
+		else:
+			score_text = f'cp {score}'
+		self.send(
+			f'info depth {depth} score {score_text} nodes {nodes} nps {int(nodes / max(elapsed, 1e-6))} time {int(elapsed * 1000)} '
+			f'pv {" ".join(move_to_uci(move) for move in pv)}'
+		)
+
+
+if __name__ == '__main__':
+	UCI().run()
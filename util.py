@@ -1,4 +1,5 @@
 import turtle
+import assets
 from pathlib import Path
 
 colors = ['dark', 'light']  # the possible colors (useful for looping through all possible pieces)
@@ -7,6 +8,8 @@ shapes = ['king', 'queen', 'rook', 'bishop', 'knight', 'pawn']  # the possible p
 end_rows = ['rook', 'knight', 'bishop', 'queen', 'king', 'bishop', 'knight', 'rook']  # the order of pieces in the end rows
 promotable_to = ['rook', 'knight', 'bishop', 'queen']  # the pieces to which a pawn can be promoted
 
+piece_scale = 56 / 75  # how big the pieces are compared to the squares (the prebuilt piece icons are 56px, for 75px squares)
+
 
 def setup_internal_turtle(trtl):
 	'''internal turtles are ones that are not used to draw. Characteristics desirable of those turtles are:
@@ -23,13 +26,26 @@ def get_piece_path(color, shape):
 	return str(Path('pieces') / color / f'{shape}.gif')  # convert ``Path`` to string before returning
 
 
-def register_piece_shapes(screen):
-	'''Loop through all possible chess pieces and register them with the screen.'''
+def get_piece_svg_path(color, shape):
+	'''Construct the path to a piece's SVG based on the color and the shape. The companion of ``get_piece_path``.'''
+	return str(Path('svg_pieces') / color / f'{shape}.svg')
+
+
+def register_piece_shapes(screen, board_size):
+	'''Loop through all possible chess pieces and register them with the screen, sized to fit the squares of a board of size ``board_size``.'''
+	# the pieces are rasterized from their SVGs at the right size (see ``assets.register_image``).
+	size = round(board_size / 8 * piece_scale)
 	# this could be done with only one loop (looping through the pieces), but this is more readable, and takes the same amount of time.
 	for color in colors:  # loop through the colors
 		for shape in shapes:  # then loop through the shapes
-			# for each color-shape combo, get the path to the icon and register it with the screen.
-			screen.register_shape(get_piece_path(color, shape))
+			# for each color-shape combo, register the icon with the screen under the path of the prebuilt icon.
+			assets.register_image(screen, get_piece_path(color, shape), get_piece_svg_path(color, shape), size)
+
+
+def register_selection_shape(screen, board_size):
+	'''Register the selection halo with the screen, sized to fit around the squares of a board of size ``board_size``. Returns the shape's name.'''
+	assets.register_image(screen, 'selection.gif', 'selection.svg', round(board_size / 8))
+	return 'selection.gif'
 
 
 def square(trtl, side):
@@ -39,8 +55,9 @@ def square(trtl, side):
 		trtl.left(90)  # turn to draw the next
 
 
-def draw_board(trtl, board_size):
-	'''Draw the board. This includes the checkerboard pattern and the borders.'''
+def draw_board(trtl, board_size, center=(0, 0)):
+	'''Draw the board, centered on ``center``. This includes the checkerboard pattern and the borders.'''
+	center_x, center_y = center  # unpack
 	# make sure to show the turtle during the drawing process.
 	trtl.showturtle()
 	# draw borders, of which there are two. Use a loop to avoid repeated code.
@@ -48,8 +65,9 @@ def draw_board(trtl, board_size):
 		# for each border, there are a few steps.
 		# first, move the turtle to the corner.
 		trtl.up()  # lift
-		trtl.goto(-border_size, -border_size)  # move
-		# then, set the turtle down and set its pensize to prepare for drawing
+		trtl.goto(center_x - border_size, center_y - border_size)  # move
+		# then, face the right way, set the turtle down and set its pensize to prepare for drawing
+		trtl.seth(0)  # face right (the checkerboard pattern leaves the turtle facing elsewhere when drawing more than one board)
 		trtl.down()  # set down
 		trtl.pensize(4)  # set the pen size
 		# then draw the square
@@ -59,7 +77,7 @@ def draw_board(trtl, board_size):
 	# the next step is to draw the light tan square that forms the light squares on the board. This is a bit nicer on the eyes compared to white-on-black.
 	# first, go to the corner
 	trtl.up()  # lift pen to not trace since we just want to fill
-	trtl.goto(-board_size / 2, -board_size / 2)  # go to corner
+	trtl.goto(center_x - board_size / 2, center_y - board_size / 2)  # go to corner
 	trtl.color('#fdfaf7')  # this is a very light tan
 	trtl.begin_fill()
 	# draw the square, filling
@@ -74,7 +92,7 @@ def draw_board(trtl, board_size):
 		# lift since we don't want the stroke, just the fill
 		trtl.up()
 		# go to the corner, using the loop variable to determine the position (2*i squares to the right from the bottom-left corner of the board)
-		trtl.goto(-board_size / 2 + square_size * 2 * i, -board_size / 2)
+		trtl.goto(center_x - board_size / 2 + square_size * 2 * i, center_y - board_size / 2)
 		# make sure we are facing the right way.
 		trtl.seth(0)
 		trtl.color('black')
@@ -127,6 +145,14 @@ def create_taken_piece_indicator(screen):
 	return {color: {shape: create_piece(screen, color, shape) for shape in shapes if shape != 'king'} for color in colors}
 
 
+def square_center(board_size, x, y, center=(0, 0)):
+	'''Get the raw coordinates of the center of the square at the indices (x, y), on a board of size ``board_size`` centered on ``center``.'''
+	square_size = board_size / 8  # there are eight squares in the board
+	# x is from the left and y is from the top, adding half of a square to get to the center. ``turtle`` handles coordinates in a way that necessitates the...
+	# ...negation of y.
+	return center[0] - board_size / 2 + (x + 0.5) * square_size, center[1] + board_size / 2 - (y + 0.5) * square_size
+
+
 def move_board_pieces(board, board_size, square_size):
 	'''Move all of the pieces in the board array to their correct position based on their position in the array.'''
 	# the starts of the pieces are the centers. The center is found by taking the negative corner of the board and adding back half of the square size.
@@ -143,6 +169,32 @@ def move_board_pieces(board, board_size, square_size):
 				item.goto(piece_start_x + square_size * x, piece_start_y - square_size * y)
 
 
+def draw_instructions(trtl, text, font):
+	'''Write the instructions in a white box in the middle of the window, covering whatever is under them. Clearing the turtle removes them.'''
+	# first clear any existing box and writing
+	trtl.clear()
+	lines = text.split('\n')
+	# work out roughly how big the box needs to be. In a monospaced font the characters are about 0.8 times as wide as the font size, and the lines are about
+	# 1.6 times as tall. Add a margin of 20 on each side.
+	width = max(len(line) for line in lines) * font[1] * 0.8 + 40
+	height = len(lines) * font[1] * 1.6 + 40
+	# draw the box, starting at the bottom-left corner and facing right.
+	trtl.goto(-width / 2, -height / 2)
+	trtl.seth(0)
+	trtl.color('black', 'white')  # black border, white fill
+	trtl.pensize(2)
+	trtl.down()
+	trtl.begin_fill()
+	for side in [width, height, width, height]:
+		trtl.forward(side)
+		trtl.left(90)
+	trtl.end_fill()
+	trtl.up()
+	# the text is written upwards from the turtle's position, so start at the bottom margin.
+	trtl.goto(0, -height / 2 + 20)
+	trtl.write(text, align='center', font=font)
+
+
 def draw_turn_indicator(trtl, is_blacks_turn, font, pos):
 	'''Write the indicator of whose turn it is, on the side of that player.'''
 	# first clear any existing writing
@@ -155,6 +207,13 @@ def draw_turn_indicator(trtl, is_blacks_turn, font, pos):
 	trtl.write(f"{'Black' if is_blacks_turn else 'White'}’s Turn", align='center', font=font)
 
 
+def draw_game_over(trtl, text, is_blacks_turn, font, pos):
+	'''Write ``text`` (like who won) in place of the turn indicator, on the side of the player whose turn it would be (see ``draw_turn_indicator``).'''
+	trtl.clear()
+	trtl.goto(pos[0], (pos[1]) * (-1 if is_blacks_turn else 1) - font[1] * 1.5)
+	trtl.write(text, align='center', font=font)
+
+
 def move_piece_indicators(board_size, indicators):
 	'''Move the indicators of the taken pieces.'''
 	# the y-coordinate of the pieces is above the edge of the board by 150 units.
@@ -175,48 +234,57 @@ def move_piece_indicators(board_size, indicators):
 		indicators['dark'][piece].goto(start + (i * step), y_cor)
 
 
+def create_piece_indicator_writers(indicators):
+	'''Create a writer for each taken piece indicator. Each indicator having its own writer means that one can be rewritten without touching the others.'''
+	writers = {color: {} for color in colors}
+	for color in colors:
+		for piece in indicators[color]:
+			# each writer is an internal turtle (pen up, hidden, speed 0).
+			writers[color][piece] = turtle.Turtle()
+			setup_internal_turtle(writers[color][piece])
+	return writers
+
+
 def update_piece_indicator(writer, font, number, x, y):
-	'''Update a single taken piece indicator. Used by ``update_piece_indicators``.'''
+	'''Update a single taken piece indicator. Used by ``update_taken_count``.'''
+	# first remove the "stale" number.
+	writer.clear()
 	# using the magic number 1.5, center the text vertically on the given coordinates.
 	writer.goto(x, y - font[1] * 1.5)
 	# write the given text, converting to a string for good measure. Use the font provided.
 	writer.write(str(number), move=False, align='center', font=font)
 
 
-def update_piece_indicators(writer, font, taken_pieces, indicators):
-	'''Update all of the taken piece indicators. Uses ``update_piece_indicator`` under the hood.'''
-	# first remove all of the "stale" indicators.
-	writer.clear()
-	# by updating the indicators like this, we make it so there's only one big jump, significantly speeding up the refresh time.
-	# the loop through the colors and indicators to update each.
+def update_taken_count(writers, font, taken_pieces, indicators, color, piece):
+	'''Update the taken piece indicator for one color and piece. This is all that needs to happen when a piece is captured.'''
+	update_piece_indicator(
+		writers[color][piece],  # the indicator's own writer
+		font,  # the font
+		taken_pieces[color][piece],  # the number to write
+		indicators[color][piece].xcor(),  # the indicator piece's x coordinate
+		indicators[color][piece].ycor() + (40 if color == 'dark' else -40)  # the indicator piece's y coordinate with an offset.
+	)
+
+
+def update_piece_indicators(writers, font, taken_pieces, indicators):
+	'''Update all of the taken piece indicators. Uses ``update_taken_count`` under the hood.'''
+	# loop through the colors and indicators to update each.
 	for color in colors:
 		# for each color, loop through the indicators for that color.
 		for piece in indicators[color]:
-			# for each indicator, call ``update_piece_indicator`` to write the indicator's value.
-			update_piece_indicator(
-				writer,  # the turtle
-				font,  # the font
-				taken_pieces[color][piece],  # the number to write
-				indicators[color][piece].xcor(),  # the indicator piece's x coordinate
-				indicators[color][piece].ycor() + (40 if color == 'dark' else -40)  # the indicator piece's y coordinate with an offset.
-			)
-
-
-def update_selection(trtl, coord, board_size):
-	'''Move and show/hide the blue ring that indicates selection.'''
+			# for each indicator, call ``update_taken_count`` to write the indicator's value.
+			update_taken_count(writers, font, taken_pieces, indicators, color, piece)
+
+
+def update_selection(trtl, coord, board_size, center=(0, 0)):
+	'''Move and show/hide the blue ring that indicates selection, on a board centered on ``center``.'''
 	# first check if the coordinate is `None`. If it is, then there is no selection and the turtle should be hidden.
 	if coord is None:
 		# no selection, hide turtle.
 		trtl.hideturtle()
 	else:
-		# there is a selection. The selection is passed as indices, so convert to raw coordinates.
-		board_edge = board_size / 2  # the x and y coordinate of any edge of the board (might be negated)
-		square_size = board_size / 8  # the size of a square (8 squares in the board)
-		trtl.goto(  # move the selection indicator to the selection
-			-board_edge + (coord[0] + 0.5) * square_size,  # x is from the left, adding half of a square to the coordinate to center the indicator
-			board_edge - (coord[1] + 0.5) * square_size  # y is from the top, doing the same. Again, ``turtle``` handles coordinates in a way that necessitates the...
-			# ... negation.
-		)
+		# there is a selection. The selection is passed as indices, so convert to raw coordinates and move the selection indicator there.
+		trtl.goto(square_center(board_size, coord[0], coord[1], center))
 		# finally show the turtle to make the user see the selection.
 		trtl.showturtle()
 